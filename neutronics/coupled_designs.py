@@ -0,0 +1,188 @@
+"""Coupled Thermal-Hydraulics/Neutronics Design Pipeline.
+This module connects the 1D TH parametric sweep (optimization/ht_functions)
+to the MCNP input writer. Sweep results are streamed chunk by chunk, only the
+Pareto-optimal designs are kept, and one homogeneous MCNP deck is written per
+kept design so criticality is only checked for designs that matter.
+
+The sweep results are read as the structured arrays ParametricSweep produces
+(fields 'mass', 'N_channels', 'dp', ..., 'r', 'pd'). Only the Pareto filter
+(pareto_front) is shared with the TH code in ../optimization.
+
+The following functions and classes are contained in this module:
+    *core_radius
+    *sweep_file_chunks
+    *CoupledPipeline
+"""
+import argparse
+import math
+import os
+import sys
+import numpy as np
+from mcnp_inputs import BatchInput, load_pyne_mats
+# the TH modules are not a package; share their Pareto filter
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'optimization'))
+from ht_functions import pareto_front
+
+# TH model units are SI, MCNP decks use cm
+m_to_cm = 100
+
+def core_radius(N_channels, r_cool, PD, c):
+    """Calculate the radius of a circular core that holds N_channels
+    hexagonal pin cells. Arguments may be floats or NumPy arrays.
+
+    Arguments:
+    ----------
+        N_channels (float): number of fuel channels [-]
+        r_cool (float): coolant channel radius [m]
+        PD (float): pitch to diameter ratio [-]
+        c (float): cladding thickness [m]
+    Returns:
+    --------
+        r_core (float): core radius [m]
+    """
+    # pitch across the flats of the hexagonal cell, as in Flow
+    pitch = 2*(r_cool + c)*PD
+    cell_area = math.sqrt(3)*pitch**2 / 2.0
+
+    return np.sqrt(N_channels * cell_area / math.pi)
+
+def sweep_file_chunks(path, chunksize=10000):
+    """Stream the results of a stored ParametricSweep (.npy) in chunks of
+    rows without loading the whole file.
+
+    Yields:
+    -------
+        rows (ndarray): structured array of sweep results
+    """
+    data = np.load(path, mmap_mode='r')
+    for start in range(0, len(data), chunksize):
+        yield np.array(data[start:start+chunksize])
+
+class CoupledPipeline:
+    """Filter streamed TH sweep results down to the Pareto-optimal designs
+    and write their MCNP decks.
+
+    Usage:
+        pipe = CoupledPipeline(matlib, z=0.5, c=0.00031, outdir='decks')
+        pipe.update_front(rows for start, rows in sweep.iter_sweep(...))
+        pipe.write()
+    """
+
+    def __init__(self, pnnl_mats, z, c, outdir='.',
+                 objectives=('mass', 'dp'), power=None, **deck_params):
+        """Initialize the pipeline.
+
+        Arguments:
+        ----------
+            pnnl_mats (MaterialLibrary): PyNE material library
+            z (float): core height used in the sweep [m]
+            c (float): cladding thickness used in the sweep [m]
+            outdir (str): directory for the decks and manifest
+            objectives (tuple): sweep result fields to minimize
+            power (float): thermal power written to the decks [kW]
+            deck_params: other BatchInput deck parameters (e.g. thick_refl)
+        Initialized Attributes:
+        -----------------------
+            front (ndarray): Pareto-optimal sweep rows found so far
+            n_seen (int): number of valid sweep rows processed
+        """
+        self.z = z
+        self.c = c
+        self.objectives = list(objectives)
+        self.deck_params = deck_params
+        if power is not None:
+            self.deck_params['power'] = power
+        self.writer = BatchInput(pnnl_mats, outdir)
+        self.front = None
+        self.n_seen = 0
+
+    def update_front(self, chunks):
+        """Merge chunks of sweep results into the Pareto front. Only the
+        current front and one chunk are held in memory at a time. Rows that
+        were not evaluated (zero or non-finite results) are skipped.
+
+        Arguments:
+        ----------
+            chunks (iterable): structured arrays of sweep results
+        Modified Attributes:
+        --------------------
+            front (ndarray): Pareto-optimal sweep rows
+            n_seen (int): number of valid sweep rows processed
+        Returns:
+        --------
+            front (ndarray): Pareto-optimal sweep rows
+        """
+        for rows in chunks:
+            costs = np.stack([rows[key] for key in self.objectives], axis=-1)
+            valid = np.all(np.isfinite(costs) & (costs > 0), axis=1)
+            rows = rows[valid]
+            self.n_seen += len(rows)
+            if self.front is not None:
+                rows = np.concatenate([self.front, rows])
+            costs = np.stack([rows[key] for key in self.objectives], axis=-1)
+            self.front = rows[pareto_front(costs)]
+
+        return self.front
+
+    def designs(self):
+        """Convert the Pareto-optimal sweep rows to deck parameters.
+
+        Yields:
+        -------
+            design (dict): BatchInput deck parameters [cm] and the row's TH
+            results. PD is converted to the deck's pitch convention.
+        """
+        order = np.argsort(self.front[self.objectives[0]], kind='stable')
+        for row in self.front[order]:
+            design = dict(self.deck_params)
+            # the TH pitch is 2*(r + c)*pd, the deck pitch (pin_vfracs)
+            # 2*r_cool*PD; convert so both describe the same pin cell
+            PD_deck = row['pd'] * (row['r'] + self.c) / row['r']
+            design.update({'r_core' : m_to_cm * float(core_radius(
+                               row['N_channels'], row['r'], row['pd'],
+                               self.c)),
+                           'z' : m_to_cm * self.z,
+                           'r_cool' : m_to_cm * float(row['r']),
+                           'PD' : float(PD_deck),
+                           'c' : m_to_cm * self.c})
+            design.update({key: float(row[key])
+                           for key in row.dtype.names
+                           if key not in ('r', 'pd')})
+            yield design
+
+    def write(self, manifest='manifest.csv'):
+        """Write one MCNP deck per Pareto-optimal design.
+
+        Returns:
+        --------
+            rows (list): manifest rows (deck parameters, TH results and
+            filename)
+        """
+        return self.writer.write(self.designs(), manifest)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sweep", type=str,
+                        help="stored ParametricSweep results (.npy)")
+    parser.add_argument("z", type=float, help="axial height [m]")
+    parser.add_argument("clad_t", type=float, help="cladding thickness [m]")
+    parser.add_argument("-outdir", type=str, default='.',
+                        help="directory for the MCNP decks")
+    parser.add_argument("-objectives", type=str, nargs='+',
+                        default=['mass', 'dp'],
+                        help="sweep results to minimize")
+    parser.add_argument("-power", type=float, default=None,
+                        help="thermal power [kW]")
+
+    args = parser.parse_args()
+
+    pipe = CoupledPipeline(load_pyne_mats(), args.z, args.clad_t, args.outdir,
+                           args.objectives, args.power)
+    pipe.update_front(sweep_file_chunks(args.sweep))
+    rows = pipe.write()
+    print("Wrote {0} decks for the Pareto-optimal designs of {1} sweep "
+          "points.".format(len(rows), pipe.n_seen))
+
+if __name__ == '__main__':
+    main()
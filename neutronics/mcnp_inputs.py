@@ -1,8 +1,27 @@
+import csv
+import itertools
+import json
 import math
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pyne.material import Material, MaterialLibrary
 from string import Template
 import material_data as md
 
+# default PyNE nuclear data file
+nuc_data = "/home/alex/.local/lib/python3.5/site-packages/pyne/nuc_data.h5"
+# default file for the compact material subset cache
+matlib_cache = os.path.join(os.path.expanduser('~'), '.cache',
+                            'sco2_reactor_matlib.json')
+# process-wide cache of loaded material subsets: (h5path, mtime) -> library
+_loaded_matlibs = {}
+# nuclides without cross sections, removed from the material cards
+missing_nuclides = ['8018', '8017']
+# MCNP input template
+base_input = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'base_input.txt')
+
 def build_pyne_matlib(nucdata_file=None):
     """Fetch pyne material from compendium.
 
@@ -12,7 +31,7 @@ def build_pyne_matlib(nucdata_file=None):
     Arguments:
         nucdata_file (str)[-]: Filename 'nuc_data.h5' with its full path.
     """
-    h5path = "/home/alex/.local/lib/python3.5/site-packages/pyne/nuc_data.h5"
+    h5path = nuc_data
     
     if nucdata_file:
         h5path = nucdata_file
@@ -27,6 +46,95 @@ def build_pyne_matlib(nucdata_file=None):
     
     return raw_matlib
 
+def load_pyne_mats(nucdata_file=None, cache_file=matlib_cache):
+    """Load the PyNE materials named in material_data.mats.
+
+    The subset is cached in three layers: in memory for the process, in a
+    compact JSON file (cache_file), and finally the full PyNE library. The
+    JSON cache is keyed on the nuc_data.h5 path and modification time, so it
+    is rebuilt whenever the source library changes.
+
+    Arguments:
+        nucdata_file (str)[-]: Filename 'nuc_data.h5' with its full path.
+        cache_file (str)[-]: JSON subset cache file. None disables it.
+    Returns:
+        matlib (MaterialLibrary): library of the md.mats materials
+    """
+    h5path = nucdata_file or nuc_data
+    key = (os.path.abspath(h5path), os.path.getmtime(h5path))
+    
+    if key in _loaded_matlibs:
+        return _loaded_matlibs[key]
+
+    subset = None
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file) as cache:
+            stored = json.load(cache)
+        if [stored['source'], stored['mtime']] == list(key):
+            subset = stored['materials']
+    
+    if subset is None:
+        # cache miss: read the full library once and keep the subset
+        raw_matlib = build_pyne_matlib(h5path)
+        subset = {}
+        for name in md.mats.values():
+            mat = raw_matlib[name]
+            subset[name] = {'comp': {str(nuc): frac 
+                                     for nuc, frac in mat.comp.items()},
+                            'mass': mat.mass,
+                            'density': mat.density}
+        if cache_file:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_file)),
+                        exist_ok=True)
+            with open(cache_file, 'w') as cache:
+                json.dump({'source': key[0], 'mtime': key[1],
+                           'materials': subset}, cache)
+
+    matlib = MaterialLibrary()
+    for name, mat in subset.items():
+        matlib[name] = Material({int(nuc): frac 
+                                 for nuc, frac in mat['comp'].items()},
+                                mass=mat['mass'], density=mat['density'])
+    _loaded_matlibs[key] = matlib
+
+    return matlib
+
+def load_template(template_file=base_input):
+    """Read and parse the MCNP input template.
+
+    Arguments:
+        template_file (str)[-]: template filename
+    Returns:
+        templ (Template): parsed template
+    """
+    with open(template_file) as input_tmpl:
+        return Template(input_tmpl.read())
+
+def pin_vfracs(r_cool, PD, c):
+    """Calculate the volume fractions of the hexagonal pin cell components.
+    Arguments may be floats or NumPy arrays.
+
+    Arguments:
+        r_cool (float): coolant channel radius
+        PD (float): pitch to diameter ratio
+        c (float): cladding thickness
+    Returns:
+        vfrac_cool (float): coolant volume fraction
+        vfrac_clad (float): cladding volume fraction
+        vfrac_cermet (float): cermet matrix volume fraction
+    """
+    pitch = 2*r_cool*PD
+    # calculate 'volumes' for fixed length
+    v_cool = (r_cool ** 2 * math.pi)
+    # clad volume fraction
+    v_clad = ((r_cool + c)**2 - r_cool**2)*math.pi
+    # fuel volume fraction
+    v_cermet = (math.sqrt(3)*pitch**2 / 2.0) - (r_cool + c) ** 2 * math.pi 
+
+    cell_vol = v_cool + v_clad + v_cermet
+    # calculate normalized vfracs from total cell volume
+    return v_cool / cell_vol, v_clad / cell_vol, v_cermet / cell_vol
+
 class HomogeneousInput:
     """Write Homogeneous Input File.
     Class to write homogeneous MCNP burnup input files.
@@ -67,19 +175,8 @@ class HomogeneousInput:
         self.core_vol = self.r**2 * math.pi * self.z
         self.refl_vol = ((self.r + self.refl_t)**2 - self.r**2)*math.pi * self.z
         
-        pitch = 2*r_cool*PD
-        # calculate 'volumes' for fixed length
-        v_cool = (r_cool ** 2 * math.pi)
-        # clad volume fraction
-        v_clad = ((r_cool + c)**2 - r_cool**2)*math.pi
-        # fuel volume fraction
-        v_cermet = (math.sqrt(3)*pitch**2 / 2.0) - (r_cool + c) ** 2 * math.pi 
-
-        self.cell_vol = v_cool + v_clad + v_cermet
-        # calculate normalized vfracs from total cell volume
-        self.vfrac_cool = v_cool / self.cell_vol
-        self.vfrac_clad = v_clad / self.cell_vol
-        self.vfrac_cermet = v_cermet / self.cell_vol
+        self.vfrac_cool, self.vfrac_clad, self.vfrac_cermet = \
+            pin_vfracs(r_cool, PD, c)
 
         
     def homog_core(self, enrich=0.9, r_cool=0.5, 
@@ -96,8 +193,9 @@ class HomogeneousInput:
         
         Modified Attributes:
         --------------------
+            homog_mat (Material): homogenized core material
+            core_mass (float): volume-fraction weighted cell density [g/cc]
             rho (float): fuel density
-            fuel_string (str): MCNP material string 
         """
         # get volumes, volume fractions
         self.calc_vol_vfrac(r_cool, PD, c)
@@ -132,6 +230,7 @@ class HomogeneousInput:
             core_mass += mass
         
         self.homog_mat.normalize()
+        self.core_mass = core_mass
         # total density [g/cc]
         self.rho = core_mass / self.core_vol
 
@@ -144,28 +243,34 @@ class HomogeneousInput:
             fuel_string (str): MCNP-style material card
         """
         # delete bad apple isotopes
-        missing_nuclides = ['8018', '8017']
         del self.homog_mat[missing_nuclides]
         # set material number
         self.homog_mat.metadata['mat_number'] = 1
         # write mcnp-form string
         self.fuel_string = self.homog_mat.mcnp().strip('\n')
 
-    def write_input(self):
+    def write_input(self, templ=None, outdir='.', filename=None):
         """ Write MCNP6 input files.
         This function writes the MCNP6 input files for the leakage experiment using
         the template input string. It writes a bare and reflected core input file
-        for each core radius.
+        for each core radius. If the core has not been homogenized yet, it is
+        homogenized with the homog_core defaults.
 
+        Arguments:
+        ----------
+            templ (Template) (opt): parsed input template (see load_template)
+            outdir (str) (opt): directory to write the input file to
+            filename (str) (opt): input file name
         Returns:
         --------
             filename (str): name of written MCNP6 input file
         """
+        if not hasattr(self, 'fuel_string'):
+            self.homog_core()
+            self.write_mat_string()
         # load template, substitute parameters and write input file
-        self.homog_core()
-        self.write_mat_string()
-        input_tmpl = open('base_input.txt')
-        templ = Template(input_tmpl.read())
+        if templ is None:
+            templ = load_template()
         file_string = templ.substitute(cool_frac = self.vfrac_cermet,
                                        r_core = self.r,
                                        core_z = self.z,
@@ -178,15 +283,248 @@ class HomogeneousInput:
                                        refl_vol = self.core_vol,
                                        thermal_power = self.Q_therm)
         # write the file
-        filename = 'r_{0}_{1}.i'.format(round(self.vfrac_cermet, 3), 
-                                                 round(self.r, 3))
-        ifile = open(filename, 'w')
-        ifile.write(file_string)
-        ifile.close()
+        if filename is None:
+            filename = 'r_{0}_{1}.i'.format(round(self.vfrac_cermet, 3), 
+                                                     round(self.r, 3))
+        with open(os.path.join(outdir, filename), 'w') as ifile:
+            ifile.write(file_string)
 
         return filename
 
+class NuclideMixer:
+    """Homogenize core materials with nuclide arrays.
+    Every core component is stored as a mass-fraction vector over one fixed,
+    sorted nuclide index. Mixtures for many sets of volume fractions are then
+    computed as a single matrix product instead of PyNE Material arithmetic,
+    and the MCNP material card is formatted directly from the array.
+    """
+    # mixture rows: the fuel is split into its U-235 and U-238 parts so the
+    # enrichment enters only through the mixing weights
+    components = ['fuel235', 'fuel238', 'matr', 'cool', 'clad']
+
+    def __init__(self, pnnl_mats):
+        """Build the nuclide index and component mass-fraction matrix.
+
+        Initialized Attributes:
+        -----------------------
+            nucids (ndarray): sorted PyNE nuclide ids
+            comp (ndarray): component mass fractions [components x nuclides]
+            comp_mass (ndarray): mass of each component Material [-]
+        """
+        mats = {'fuel235' : Material(md.enrich_fuel(1)),
+                'fuel238' : Material(md.enrich_fuel(0))}
+        for mat in ['matr', 'cool', 'clad']:
+            mats[mat] = pnnl_mats[md.mats[mat]]
+        
+        self.nucids = np.array(sorted(set().union(*[mats[mat].comp.keys()
+                                              for mat in self.components])))
+        index = {nuc : i for i, nuc in enumerate(self.nucids)}
+        self.comp = np.zeros((len(self.components), len(self.nucids)))
+        for row, mat in enumerate(self.components):
+            for nuc, frac in mats[mat].comp.items():
+                self.comp[row, index[nuc]] = frac
+        self.comp_mass = np.array([mats[mat].mass for mat in self.components])
+        # MCNP ZAIDs (ZZAAA) and the columns written to the material cards
+        self.zaids = (self.nucids // 10000000) * 1000 +\
+            (self.nucids // 10000) % 1000
+        self.keep = ~np.isin(self.zaids, [int(nuc) for nuc in missing_nuclides])
+
+    def mix(self, vfrac_cermet, vfrac_cool, vfrac_clad, rho_cool=0.087,
+            enrich=0.9):
+        """Homogenize the core for arrays of volume fractions (see
+        HomogeneousInput.homog_core). Arguments are broadcast against each
+        other.
+
+        Returns:
+        --------
+            fracs (ndarray): normalized mass fractions [designs x nuclides]
+            core_mass (ndarray): volume-fraction weighted cell density [g/cc]
+        """
+        vfrac_cermet, vfrac_cool, vfrac_clad, rho_cool, enrich = \
+            np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=float))
+                                  for x in (vfrac_cermet, vfrac_cool,
+                                            vfrac_clad, rho_cool, enrich)])
+        fuel = vfrac_cermet * md.vfrac_UN * md.rho_UN
+        # volume-weighted densities/masses of each component row
+        mass = np.stack([fuel * enrich,
+                         fuel * (1 - enrich),
+                         vfrac_cermet * (1 - md.vfrac_UN) * md.rho_W,
+                         vfrac_cool * rho_cool,
+                         vfrac_clad * md.rho_In], axis=-1)
+        # cell density from the same rows that are mixed below
+        core_mass = mass.sum(axis=-1)
+        # Material * mass scales the Material's own mass
+        weights = mass * self.comp_mass
+        fracs = np.dot(weights, self.comp) / weights.sum(axis=-1)[..., None]
+
+        return fracs, core_mass
+
+    def mcnp_card(self, fracs, mat_number=1):
+        """Write one homogenized composition as an MCNP material card (mass
+        fractions), without the missing nuclides.
+
+        Arguments:
+        ----------
+            fracs (ndarray): mass fractions over the nuclide index
+            mat_number (int): MCNP material number
+        Returns:
+        --------
+            fuel_string (str): MCNP-style material card
+        """
+        lines = ['m{0}'.format(mat_number)]
+        for zaid, frac in zip(self.zaids[self.keep], fracs[self.keep]):
+            if frac > 0:
+                lines.append('     {0} -{1:.4e}'.format(zaid, frac))
+
+        return '\n'.join(lines)
+
+class BatchInput:
+    """Write many homogeneous MCNP input files.
+    The template is parsed once, and the homogenized material card is built
+    once per unique pin-cell composition and reused for every deck with that
+    composition. With vectorized=True the unique compositions are all
+    homogenized at once by a NuclideMixer. Decks are written by a pool of
+    threads.
+    """
+    # deck parameters and their defaults (HomogeneousInput units)
+    defaults = {'r_core' : 15,      # core radius [cm]
+                'z' : 30,           # core height [cm]
+                'power' : 150,      # thermal power [kW]
+                'thick_refl' : 15,  # reflector thickness [cm]
+                'enrich' : 0.9,     # U-235 enrichment [-]
+                'r_cool' : 0.5,     # coolant channel radius [cm]
+                'PD' : 1.48,        # pitch to diameter ratio [-]
+                'rho_cool' : 0.087, # coolant density [g/cc]
+                'c' : 0.031         # clad thickness [cm]
+               }
+    # parameters that set the homogenized composition
+    comp_keys = ['enrich', 'r_cool', 'PD', 'rho_cool', 'c']
+
+    def __init__(self, pnnl_mats, outdir='.', template_file=base_input,
+                 workers=4, vectorized=True):
+        """Initialize the batch writer.
+
+        Initialized Attributes:
+        -----------------------
+            matlib (MaterialLibrary): PyNE material library
+            outdir (str): directory for the input files and manifest
+            templ (Template): parsed input template
+            workers (int): number of writer threads
+            mixer (NuclideMixer): array homogenizer, None to homogenize with
+            PyNE Material arithmetic
+            compositions (dict): composition key -> (fuel_string, core_mass)
+        """
+        self.matlib = pnnl_mats
+        self.outdir = outdir
+        self.templ = load_template(template_file)
+        self.workers = workers
+        self.mixer = NuclideMixer(pnnl_mats) if vectorized else None
+        self.compositions = {}
+        os.makedirs(outdir, exist_ok=True)
+
+    def homogenize(self, designs):
+        """Homogenize every new composition in designs with one NuclideMixer
+        matrix product.
+
+        Modified Attributes:
+        --------------------
+            compositions (dict): composition key -> (fuel_string, core_mass)
+        """
+        keys = {tuple(design[name] for name in self.comp_keys)
+                for design in designs}
+        keys = sorted(keys - set(self.compositions))
+        if not keys:
+            return
+        enrich, r_cool, PD, rho_cool, c = np.array(keys).T
+        vfrac_cool, vfrac_clad, vfrac_cermet = pin_vfracs(r_cool, PD, c)
+        fracs, core_mass = self.mixer.mix(vfrac_cermet, vfrac_cool,
+                                          vfrac_clad, rho_cool, enrich)
+        for idx, key in enumerate(keys):
+            self.compositions[key] = (self.mixer.mcnp_card(fracs[idx]),
+                                      core_mass[idx])
+
+    def composition(self, design):
+        """Get the MCNP material card and cell density for the design's
+        composition, homogenizing it on first use.
+
+        Returns:
+            fuel_string (str): MCNP-style material card
+            core_mass (float): volume-fraction weighted cell density [g/cc]
+        """
+        key = tuple(design[name] for name in self.comp_keys)
+        if key not in self.compositions:
+            deck = HomogeneousInput(design['r_core'], design['z'],
+                                    design['power'], self.matlib,
+                                    design['thick_refl'])
+            deck.homog_core(**{name: design[name] for name in self.comp_keys})
+            deck.write_mat_string()
+            self.compositions[key] = (deck.fuel_string, deck.core_mass)
+
+        return self.compositions[key]
+
+    def write(self, designs, manifest='manifest.csv'):
+        """Write one input file per design and a manifest that maps the deck
+        parameters to the file names.
+
+        Arguments:
+        ----------
+            designs (iterable): dicts of deck parameters (see defaults).
+            Missing parameters take their default values; other entries are
+            copied to the manifest.
+            manifest (str): manifest file name in outdir
+        Returns:
+        --------
+            rows (list): manifest rows (deck parameters and filename)
+        """
+        designs = [dict(self.defaults, **params) for params in designs]
+        if self.mixer is not None:
+            self.homogenize(designs)
+
+        rows = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            writes = []
+            for idx, design in enumerate(designs):
+                fuel_string, core_mass = self.composition(design)
+
+                deck = HomogeneousInput(design['r_core'], design['z'],
+                                        design['power'], self.matlib,
+                                        design['thick_refl'])
+                deck.calc_vol_vfrac(design['r_cool'], design['PD'],
+                                    design['c'])
+                deck.fuel_string = fuel_string
+                deck.rho = core_mass / deck.core_vol
+                design['filename'] = 'deck_{0:06d}.i'.format(idx)
+                writes.append(pool.submit(deck.write_input, self.templ,
+                                          self.outdir, design['filename']))
+                rows.append(design)
+            # raise any write errors
+            for write in writes:
+                write.result()
+
+        # extra design entries (e.g. TH results) follow the deck parameters
+        extra = set().union(*rows) - set(self.defaults) - {'filename'}
+        fields = sorted(self.defaults) + sorted(extra) + ['filename']
+        with open(os.path.join(self.outdir, manifest), 'w') as mfile:
+            writer = csv.DictWriter(mfile, fieldnames=fields,
+                                    extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+
+        return rows
+
+def design_grid(**axes):
+    """Generate the Cartesian product of deck parameter values.
+
+    Example:
+        design_grid(r_core=[10, 15], PD=[1.2, 1.48])
+    Returns:
+        designs (generator): dicts of deck parameters
+    """
+    names = sorted(axes)
+    for values in itertools.product(*[axes[name] for name in names]):
+        yield dict(zip(names, values))
+
 if __name__=='__main__':
-    matlib = build_pyne_matlib()
+    matlib = load_pyne_mats()
     test = HomogeneousInput(10, 5, 150, matlib)
     test.write_input()
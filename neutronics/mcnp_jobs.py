@@ -0,0 +1,321 @@
+"""Local MCNP Job Scheduler.
+This module runs batches of MCNP decks (see mcnp_inputs.BatchInput) on a
+fixed number of local worker slots. Failed runs are retried, keff and cell
+flux tallies are parsed from the outputs, and the results are collected in a
+table that can be written next to the deck manifest.
+
+The runner is pluggable: any callable runner(deck, output) that returns an
+exit code can replace MCNPRunner, e.g. a fake MCNP executable for testing.
+
+The following functions and classes are contained in this module:
+    *parse_keff
+    *parse_tallies
+    *parse_output
+    *MCNPRunner
+    *JobQueue
+"""
+import argparse
+import csv
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# final keff estimate, printed once per kcode run (or burn step)
+keff_pattern = re.compile(r'final estimated combined collision/absorption/'
+                          r'track-length keff = +(\S+) +with an estimated '
+                          r'standard deviation of +(\S+)')
+tally_pattern = re.compile(r'^1tally +(\d+) ', re.MULTILINE)
+cell_pattern = re.compile(r'^ +cell +(\d+) *$')
+value_pattern = re.compile(r'^ +(?:total +)?(\S+E[+-]\d+) +(\d\.\d+) *$')
+
+def parse_keff(text):
+    """Parse every final keff estimate from an MCNP output.
+
+    Arguments:
+    ----------
+        text (str): MCNP output file contents
+    Returns:
+    --------
+        keffs (list): (keff, standard deviation) per kcode run/burn step
+    """
+    return [(float(keff), float(std))
+            for keff, std in keff_pattern.findall(text)]
+
+def parse_tallies(text):
+    """Parse the cell tallies (e.g. F4 flux) from an MCNP output. For
+    energy-binned tallies the total over all bins is used. If a tally is
+    printed several times (burn steps), the last print is kept.
+
+    Arguments:
+    ----------
+        text (str): MCNP output file contents
+    Returns:
+    --------
+        tallies (dict): (tally number, cell) -> (value, relative error)
+    """
+    tallies = {}
+    starts = [(m.start(), int(m.group(1)))
+              for m in tally_pattern.finditer(text)]
+    for idx, (start, tally) in enumerate(starts):
+        # a tally print ends at the next page (line starting with '1')
+        end = text.find('\n1', start + 1)
+        lines = text[start:end if end > 0 else len(text)].splitlines()
+        cell = None
+        binned = False
+        for line in lines:
+            match = cell_pattern.match(line)
+            if match:
+                cell = int(match.group(1))
+                binned = False
+                continue
+            if cell is None:
+                continue
+            if line.strip() == 'energy':
+                binned = True
+                continue
+            match = value_pattern.match(line)
+            if match and (not binned or line.split()[0] == 'total'):
+                tallies[(tally, cell)] = (float(match.group(1)),
+                                          float(match.group(2)))
+                cell = None
+
+    return tallies
+
+def parse_output(path):
+    """Parse the results of one MCNP run.
+
+    Returns:
+    --------
+        results (dict): final keff, its standard deviation, the number of keff
+        estimates (burn steps) and the cell tallies; None if the output has
+        no keff estimate
+    """
+    with open(path) as outfile:
+        text = outfile.read()
+    keffs = parse_keff(text)
+    if not keffs:
+        return None
+
+    return {'keff' : keffs[-1][0],
+            'keff_std' : keffs[-1][1],
+            'keff_steps' : len(keffs),
+            'tallies' : parse_tallies(text)}
+
+class MCNPRunner:
+    """Run MCNP as a subprocess in the deck's directory.
+
+    The command is a list of arguments formatted with the deck file name
+    ({input}), output file name ({output}), restart file name ({runtpe}) and
+    deck name without extension ({name}).
+    """
+    command = ['mcnp6', 'i={input}', 'o={output}', 'runtpe={runtpe}']
+
+    def __init__(self, command=None, timeout=None):
+        """Initialize the runner.
+
+        Initialized Attributes:
+        -----------------------
+            command (list): command template (default: mcnp6)
+            timeout (float): seconds before a run is killed, None for no limit
+        """
+        if command is not None:
+            self.command = list(command)
+        self.timeout = timeout
+
+    def __call__(self, deck, output):
+        """Run one deck. Stale outputs of an earlier attempt are removed
+        first, since MCNP does not overwrite them.
+
+        Returns:
+        --------
+            returncode (int): exit code of the run (-1 on timeout)
+        """
+        workdir = os.path.dirname(os.path.abspath(deck))
+        name = os.path.splitext(os.path.basename(deck))[0]
+        files = {'input' : os.path.basename(deck),
+                 'output' : os.path.basename(output),
+                 'runtpe' : name + '.r',
+                 'name' : name}
+        for stale in (output, os.path.join(workdir, files['runtpe'])):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+        with open(os.path.join(workdir, name + '.log'), 'w') as log:
+            try:
+                return subprocess.call([arg.format(**files)
+                                        for arg in self.command],
+                                       cwd=workdir, stdout=log,
+                                       stderr=subprocess.STDOUT,
+                                       timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                return -1
+
+class JobQueue:
+    """Schedule MCNP decks on a fixed number of local worker slots.
+    Every job is a dict holding its deck parameters, 'deck', 'status'
+    ('queued', 'running', 'done' or 'failed'), 'attempts' and, once done,
+    the parsed results.
+    """
+    # results table columns after the deck parameters
+    result_fields = ['deck', 'status', 'attempts', 'keff', 'keff_std',
+                     'keff_steps']
+
+    def __init__(self, runner=None, workers=None, retries=1):
+        """Initialize the queue.
+
+        Initialized Attributes:
+        -----------------------
+            runner (callable): runner(deck, output) -> exit code
+            workers (int): number of concurrent runs (default: CPU count)
+            retries (int): extra attempts for a failed run
+            jobs (list): queued, running and finished jobs
+        """
+        self.runner = runner or MCNPRunner()
+        self.workers = workers or os.cpu_count()
+        self.retries = retries
+        self.jobs = []
+        self._lock = threading.Lock()
+
+    def add(self, deck, **params):
+        """Queue one deck.
+
+        Arguments:
+        ----------
+            deck (str): MCNP input file
+            params: deck parameters copied to the results table
+        Returns:
+        --------
+            job (dict): the queued job
+        """
+        job = dict(params)
+        job.update({'deck' : deck, 'status' : 'queued', 'attempts' : 0})
+        self.jobs.append(job)
+
+        return job
+
+    def add_manifest(self, manifest):
+        """Queue every deck of a BatchInput manifest. Deck files are relative
+        to the manifest's directory.
+        """
+        outdir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest) as mfile:
+            for row in csv.DictReader(mfile):
+                self.add(os.path.join(outdir, row['filename']), **row)
+
+    def run_job(self, job):
+        """Run one job until it succeeds or runs out of attempts. A run
+        fails if it exits with an error or its output has no keff estimate.
+        """
+        output = os.path.splitext(job['deck'])[0] + '.o'
+        while job['attempts'] <= self.retries:
+            with self._lock:
+                job['status'] = 'running'
+                job['attempts'] += 1
+            returncode = self.runner(job['deck'], output)
+            results = None
+            if returncode == 0 and os.path.exists(output):
+                results = parse_output(output)
+            if results is not None:
+                with self._lock:
+                    job.update(results)
+                    job['output'] = output
+                    job['status'] = 'done'
+                return job
+
+        with self._lock:
+            job['status'] = 'failed'
+        return job
+
+    def run(self):
+        """Run every queued job, at most `workers` at a time.
+
+        Returns:
+        --------
+            jobs (list): all jobs
+        """
+        queued = [job for job in self.jobs if job['status'] == 'queued']
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # raise any scheduler errors
+            for run in [pool.submit(self.run_job, job) for job in queued]:
+                run.result()
+
+        return self.jobs
+
+    def status(self):
+        """Count the jobs in each status.
+
+        Returns:
+        --------
+            counts (dict): status -> number of jobs
+        """
+        counts = {}
+        with self._lock:
+            for job in self.jobs:
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+
+        return counts
+
+    def results_table(self):
+        """Flatten the jobs into table rows. Tallies become '<tally>_<cell>'
+        and '<tally>_<cell>_err' columns, e.g. 'F4_1'.
+
+        Returns:
+        --------
+            rows (list): dicts of deck parameters and results
+        """
+        rows = []
+        for job in self.jobs:
+            row = {key: value for key, value in job.items()
+                   if key != 'tallies'}
+            for (tally, cell), (value, err) in job.get('tallies', {}).items():
+                row['F{0}_{1}'.format(tally, cell)] = value
+                row['F{0}_{1}_err'.format(tally, cell)] = err
+            rows.append(row)
+
+        return rows
+
+    def write_results(self, path):
+        """Write the results table as CSV.
+
+        Returns:
+        --------
+            rows (list): table rows
+        """
+        rows = self.results_table()
+        params = set().union(*rows) - set(self.result_fields) - {'output'}
+        fields = self.result_fields + sorted(params)
+        with open(path, 'w') as rfile:
+            writer = csv.DictWriter(rfile, fieldnames=fields,
+                                    extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("manifest", type=str,
+                        help="BatchInput manifest of the decks to run")
+    parser.add_argument("-workers", type=int, default=None,
+                        help="concurrent MCNP runs (default: CPU count)")
+    parser.add_argument("-retries", type=int, default=1,
+                        help="extra attempts for failed runs")
+    parser.add_argument("-command", type=str, nargs='+', default=None,
+                        help="MCNP command template, e.g. " +\
+                             "mcnp6 i={input} o={output} tasks 4")
+    parser.add_argument("-results", type=str, default='results.csv',
+                        help="results table file name")
+
+    args = parser.parse_args()
+
+    queue = JobQueue(MCNPRunner(args.command), args.workers, args.retries)
+    queue.add_manifest(args.manifest)
+    queue.run()
+    queue.write_results(os.path.join(os.path.dirname(
+        os.path.abspath(args.manifest)), args.results))
+    print(queue.status())
+
+if __name__ == '__main__':
+    main()
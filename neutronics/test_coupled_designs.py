@@ -0,0 +1,61 @@
+import math
+import os
+import numpy as np
+from pytest import approx
+from coupled_designs import CoupledPipeline, core_radius
+from mcnp_inputs import pin_vfracs
+from test_mcnp_inputs import matlib
+
+# sweep results in the ParametricSweep layout
+fields = ['mass', 'N_channels', 'dp', 'r', 'pd']
+rows = np.zeros(6, dtype={'names': fields, 'formats': ['f8']*len(fields)})
+rows['mass'] = [10, 12, 11, 9, 15, 0]
+rows['dp'] = [4e5, 2e5, 5e5, 4.8e5, 1e5, 0]
+rows['N_channels'] = [500, 400, 450, 600, 300, 0]
+rows['r'] = [0.004, 0.005, 0.0045, 0.0035, 0.006, 0.002]
+rows['pd'] = [1.5, 1.6, 1.55, 1.45, 1.7, 1.1]
+
+def test_core_radius():
+    """Test that the core area equals N_channels hexagonal cells.
+    """
+    r, PD, c, N = 0.005, 2, 0.00031, 1000
+    pitch = 2*(r + c)*PD
+    obs = core_radius(N, r, PD, c)
+    
+    assert math.pi*obs**2 == approx(N*math.sqrt(3)/2*pitch**2)
+
+def test_deck_fuel_volume(matlib, tmp_path):
+    """Test that the homogenized deck holds the fuel volume of the TH design:
+    N_channels x the TH fuel area per channel x z.
+    """
+    c = 0.00031
+    pipe = CoupledPipeline(matlib, 0.5, c, str(tmp_path))
+    pipe.update_front([rows])
+
+    front = np.sort(pipe.front, order='mass')
+    for row, design in zip(front, pipe.designs()):
+        r, pd = row['r'], row['pd']
+        A_fuel = math.sqrt(3)*(2*(r + c)*pd)**2 / 2.0 - (r + c)**2*math.pi
+        exp = design['N_channels'] * A_fuel * 0.5 * 100**3
+        vfrac_cermet = pin_vfracs(design['r_cool'], design['PD'],
+                                  design['c'])[2]
+        obs = vfrac_cermet * math.pi*design['r_core']**2 * design['z']
+        assert obs == approx(exp, rel=1e-9)
+
+def test_pipeline(matlib, tmp_path):
+    """Test that streamed chunks give the Pareto front of the whole sweep and
+    that one deck is written per front design.
+    """
+    pipe = CoupledPipeline(matlib, 0.5, 0.00031, str(tmp_path))
+    front = pipe.update_front([rows[:3], rows[3:]])
+    
+    assert pipe.n_seen == 5
+    assert sorted(front['mass']) == [9, 10, 12, 15]
+    
+    written = pipe.write()
+    assert [row['mass'] for row in written] == [9, 10, 12, 15]
+    assert written[1]['r_core'] ==\
+        approx(100*core_radius(500, 0.004, 1.5, 0.00031))
+    assert written[1]['r_cool'] == approx(0.4)
+    for row in written:
+        assert os.path.exists(os.path.join(str(tmp_path), row['filename']))
@@ -1,14 +1,26 @@
 import os
+import pytest
 from pytest import approx
-from mcnp_inputs import HomogeneousInput, build_pyne_matlib
+from mcnp_inputs import HomogeneousInput, BatchInput, NuclideMixer,\
+    build_pyne_matlib, load_pyne_mats, design_grid
+import material_data as md
+import mcnp_inputs
 
 if os.environ.get('APP_ENV') == 'docker':
     nucdata = '/root/.local/lib/python3.5/site-packages/pyne/nuc_data.h5'
-    matlib = build_pyne_matlib(nucdata)
 else:
-    matlib = build_pyne_matlib()
+    nucdata = None
 
-def test_norm_comp():
+@pytest.fixture(scope='module')
+def matlib(tmp_path_factory):
+    """PyNE material library, cached in a temporary directory instead of the
+    default cache location in the home directory.
+    """
+    cache_file = tmp_path_factory.mktemp('matlib') / 'matlib.json'
+
+    return load_pyne_mats(nucdata, str(cache_file))
+
+def test_norm_comp(matlib):
     # build example input file
     obs = HomogeneousInput(15, 0.6, 150, matlib)
     obs.homog_core()
@@ -19,7 +31,7 @@ def test_norm_comp():
 
     assert obs_total_frac == approx(1, abs=1e-7)
 
-def test_homog_comp():
+def test_homog_comp(matlib):
     """Test fuel, clad, coolant homogenization process.
     """
     exp_comp = {
@@ -87,3 +99,70 @@ def test_homog_comp():
     for iso in obs_mat:
         assert exp_comp[iso] == approx(obs_mat[iso], abs=1e-5)
     
+
+def test_cached_matlib(tmp_path):
+    """Test that the material subset read back from the JSON cache matches the
+    full PyNE library, and that it is reused within the process.
+    """
+    full = build_pyne_matlib(nucdata)
+    cache_file = str(tmp_path / 'matlib.json')
+    # build the JSON cache, then load from it
+    mcnp_inputs._loaded_matlibs.clear()
+    load_pyne_mats(nucdata, cache_file)
+    mcnp_inputs._loaded_matlibs.clear()
+    obs = load_pyne_mats(nucdata, cache_file)
+    
+    assert os.path.exists(cache_file)
+    assert load_pyne_mats(nucdata, cache_file) is obs
+    for name in md.mats.values():
+        for nuc, frac in full[name].comp.items():
+            assert obs[name].comp[nuc] == approx(frac, rel=1e-12)
+
+def test_batch_input(matlib, tmp_path):
+    """Test that the batch writer reuses compositions, writes a manifest and
+    produces the same deck as a single HomogeneousInput.
+    """
+    outdir = str(tmp_path)
+    batch = BatchInput(matlib, outdir, vectorized=False)
+    rows = batch.write(design_grid(r_core=[10, 15], z=[20, 30], PD=[1.2, 1.48]))
+    
+    assert len(rows) == 8
+    assert len(batch.compositions) == 2
+    with open(os.path.join(outdir, 'manifest.csv')) as manifest:
+        assert len(manifest.readlines()) == 9
+    
+    exp = HomogeneousInput(10, 20, 150, matlib)
+    exp.homog_core(PD=1.2)
+    exp.write_mat_string()
+    exp.write_input(outdir=outdir, filename='exp.i')
+    with open(os.path.join(outdir, 'exp.i')) as expfile,\
+         open(os.path.join(outdir, rows[0]['filename'])) as obsfile:
+        assert expfile.read() == obsfile.read()
+
+
+def test_nuclide_mixer(matlib):
+    """Test that the array homogenization matches the PyNE Material
+    arithmetic for several designs at once, including the material card.
+    """
+    PDs = [1.2, 1.48, 2.0]
+    mixer = NuclideMixer(matlib)
+    decks = [HomogeneousInput(15, 0.6, 150, matlib) for PD in PDs]
+    for deck, PD in zip(decks, PDs):
+        deck.homog_core(PD=PD)
+    
+    fracs, core_mass = mixer.mix([deck.vfrac_cermet for deck in decks],
+                                 [deck.vfrac_cool for deck in decks],
+                                 [deck.vfrac_clad for deck in decks])
+    
+    for idx, deck in enumerate(decks):
+        assert core_mass[idx] == approx(deck.core_mass, rel=1e-12)
+        for nuc, frac in zip(mixer.nucids, fracs[idx]):
+            assert frac == approx(deck.homog_mat[nuc], rel=1e-9, abs=1e-15)
+        deck.write_mat_string()
+        exp = deck.fuel_string.split('\n')[-len(deck.homog_mat):]
+        obs = mixer.mcnp_card(fracs[idx]).split('\n')[1:]
+        for exp_line, obs_line in zip(exp, obs):
+            assert exp_line.split()[0] == obs_line.split()[0]
+            assert float(exp_line.split()[1]) ==\
+                approx(float(obs_line.split()[1]), rel=1e-3)
+        assert len(obs) == len(exp)
@@ -0,0 +1,71 @@
+import csv
+import sys
+from pytest import approx
+from mcnp_jobs import JobQueue, MCNPRunner, parse_keff, parse_tallies
+
+# excerpt of an MCNP6 kcode output with an energy-binned F4 tally
+output = """
+1tally        4        nps =     1000000
+           tally type 4    track length estimate of particle flux.
+           particle(s): neutrons
+
+ cell  1
+      energy
+    1.0000E-09   0.00000E+00 0.0000
+    1.0000E+01   1.20000E-04 0.0010
+      total      2.73285E-04 0.0007
+
+1tally        14        nps =     1000000
+ cell  2
+                 5.10000E-05 0.0020
+
+1status of the statistical checks used to form confidence intervals
+ the final estimated combined collision/absorption/track-length keff = 1.01234 with an estimated standard deviation of 0.00045
+"""
+
+# fake MCNP executable: writes the output above, but fails the first run of
+# decks named 'flaky'
+fake_mcnp = '''
+import os, sys
+args = dict(arg.split('=', 1) for arg in sys.argv[1:])
+if args['i'].startswith('flaky') and not os.path.exists('flaky.seen'):
+    open('flaky.seen', 'w').close()
+    sys.exit(1)
+if args['i'].startswith('broken'):
+    sys.exit(1)
+with open(args['o'], 'w') as out:
+    out.write({0!r})
+'''.format(output)
+
+def test_parse_output():
+    assert parse_keff(output) == [(1.01234, 0.00045)]
+    tallies = parse_tallies(output)
+    
+    assert tallies == {(4, 1): (2.73285e-4, 0.0007), (14, 2): (5.1e-5, 0.002)}
+
+def test_job_queue(tmp_path):
+    """Test scheduling, retries and the results table with a fake MCNP.
+    """
+    script = str(tmp_path / 'fake_mcnp.py')
+    with open(script, 'w') as sfile:
+        sfile.write(fake_mcnp)
+    with open(str(tmp_path / 'manifest.csv'), 'w') as mfile:
+        mfile.write('r_core,filename\n10,good.i\n15,flaky.i\n20,broken.i\n')
+    for deck in ['good.i', 'flaky.i', 'broken.i']:
+        open(str(tmp_path / deck), 'w').close()
+    
+    runner = MCNPRunner([sys.executable, script, 'i={input}', 'o={output}'])
+    queue = JobQueue(runner, workers=2, retries=1)
+    queue.add_manifest(str(tmp_path / 'manifest.csv'))
+    jobs = queue.run()
+    
+    assert queue.status() == {'done': 2, 'failed': 1}
+    assert [job['attempts'] for job in jobs] == [1, 2, 2]
+    assert jobs[1]['keff'] == approx(1.01234)
+    
+    queue.write_results(str(tmp_path / 'results.csv'))
+    with open(str(tmp_path / 'results.csv')) as rfile:
+        rows = list(csv.DictReader(rfile))
+    assert rows[0]['r_core'] == '10'
+    assert float(rows[0]['F4_1']) == approx(2.73285e-4)
+    assert rows[2]['status'] == 'failed'
@@ -0,0 +1,136 @@
+"""Adaptive Mesh Refinement Sweep.
+This module contains a sweep of the (radius, PD) pin cell space that starts
+from a coarse grid and recursively refines only the cells near the minimum
+mass or on the dp-constraint boundary (where adjust_dp sets N_channels).
+
+The following classes are contained in this module:
+    *AdaptiveSweep
+"""
+import numpy as np
+# Import TH functions
+from physical_constants import FlowProperties
+from ht_functions import ParametricSweep, flow_batch
+
+
+class AdaptiveSweep(ParametricSweep):
+    """Class to perform and store an adaptively refined parametric sweep.
+
+    Sweep points are stored on an integer lattice with M = (coarse - 1) *
+    2^levels intervals per axis. Cells are squares on this lattice; refining a
+    cell splits it into four and evaluates the new corner points. The result is
+    a point cloud in data (same fields as ParametricSweep.data) that resolves
+    the optimum as well as an (M + 1) x (M + 1) uniform sweep would.
+    """
+
+    def __init__(self, coarse=9, levels=6, mass_frac=0.05):
+        """Initialize AdaptiveSweep class.
+
+        Initialized Attributes
+        ----------------------
+            coarse: (int) grid points per axis in the starting grid.
+            levels: (int) number of refinement levels.
+            mass_frac: (float) refine cells whose lowest corner mass is within
+            this fraction of the current minimum mass.
+            M: (int) lattice intervals per axis at the finest level.
+            data: (ndarray) structured array containing results of the
+            evaluated sweep points.
+        """
+        # the point cloud starts empty and grows with every refinement
+        super().__init__(0)
+        self.coarse = coarse
+        self.levels = levels
+        self.mass_frac = mass_frac
+        self.M = (coarse - 1) * 2**levels
+        self.dp_limited = np.zeros(0, dtype=bool)
+        # lattice coordinates -> index in data
+        self.index = {}
+
+    def sweep_geometric_configs(self, radii, pds, z, c, props=None,
+                                method='newton'):
+        """Perform the adaptive sweep through pin cell geometric space. The
+        radius and PD bounds are both included in the sweep.
+
+        Modified Attributes:
+        --------------------
+            data: (ndarray) results at every evaluated point
+            solver_evals: (int) total batched N_channels evaluations
+        """
+        if props is None:
+            props = FlowProperties()
+        self.solver_evals = 0
+        step = self.M // (self.coarse - 1)
+        cells = [(a, b) for a in range(0, self.M, step)
+                 for b in range(0, self.M, step)]
+
+        while True:
+            self._evaluate(cells, step, radii, pds, z, c, props, method)
+            if step == 1:
+                break
+            cells = self.refine_cells(cells, step)
+            step //= 2
+            if not cells:
+                break
+
+    def _evaluate(self, cells, step, radii, pds, z, c, props, method):
+        """Evaluate all cell corners that are not yet in data with one
+        FlowBatch (AxialFlowBatch for axial-mode props).
+        """
+        corners = {(a + da, b + db) for (a, b) in cells
+                   for da in (0, step) for db in (0, step)}
+        new = sorted(corners.difference(self.index))
+        if not new:
+            return
+        a, b = np.array(new).T
+        R = radii[0] + a * (radii[1] - radii[0]) / self.M
+        PD = pds[0] + b * (pds[1] - pds[0]) / self.M
+
+        flowdata = flow_batch(R, PD, c, z, props)
+        self.solver_evals += flowdata.solve(method)
+
+        rows = np.zeros(len(new), dtype=self.dtype)
+        rows['r'] = R
+        rows['pd'] = PD
+        flowdata.save_results(rows)
+
+        self.index.update({pt: len(self.data) + i for i, pt in enumerate(new)})
+        self.data = np.concatenate((self.data, rows))
+        self.dp_limited = np.concatenate((self.dp_limited,
+                                          flowdata.dp_limited))
+
+    def refine_cells(self, cells, step):
+        """Select the cells to refine and split them into four sub-cells.
+
+        A cell is refined if its lowest corner mass is within mass_frac of the
+        current minimum mass, or if its corners straddle the dp-constraint
+        boundary.
+
+        Arguments:
+        ----------
+            cells: (list) lower-left lattice coordinates of current cells
+            step: (int) current cell size in lattice intervals
+        Returns:
+        --------
+            sub_cells: (list) lower-left lattice coordinates of the sub-cells
+        """
+        min_mass = np.nanmin(self.data['mass'])
+        half = step // 2
+        sub_cells = []
+        for (a, b) in cells:
+            idx = [self.index[(a + da, b + db)]
+                   for da in (0, step) for db in (0, step)]
+            low_mass = np.nanmin(self.data['mass'][idx]) <= \
+                (1 + self.mass_frac) * min_mass
+            limited = self.dp_limited[idx]
+            boundary = limited.any() and not limited.all()
+            if low_mass or boundary:
+                sub_cells += [(a + da, b + db)
+                              for da in (0, half) for db in (0, half)]
+
+        return sub_cells
+
+    def disp_min_mass(self):
+        """ Display the minimum mass configuration and the sweep cost.
+        """
+        super().disp_min_mass()
+        print("Evaluated " + str(len(self.data)) + " of " +
+              str((self.M + 1)**2) + " points in the equivalent uniform sweep.")
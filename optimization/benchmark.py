@@ -0,0 +1,149 @@
+"""Thermal-Hydraulics Benchmark Suite.
+This script times the hot path of the 1D flow model: single N_channels
+evaluations, N_channels solves with every solver, full oned_flow_modeling
+calculations and parametric sweeps at several resolutions. Results are
+written as JSON and can be compared against a stored baseline to catch
+performance regressions.
+
+The following functions are contained in this module:
+    *time_call
+    *run_benchmarks
+    *compare
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+# Import TH functions
+from physical_constants import FlowProperties
+from ht_functions import Flow, ParametricSweep, find_n_channels,\
+    oned_flow_modeling
+
+# benchmark design point and sweep bounds
+radius = 0.005
+PD = 2
+c = 0.00031
+L = 0.5
+radii = (0.002, 0.01)
+pds = (1.1, 2.5)
+solvers = ['bounded', 'newton', 'fixed-point']
+
+
+def time_call(func, repeat=5, number=None):
+    """Time a function call. Each timing run makes number calls (by default
+    enough calls to take at least 0.2 s); the best of repeat runs is reported.
+
+    Returns:
+    --------
+        seconds: (float) best time per call [s]
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run_benchmarks(sweep_sizes=(10, 50), repeat=5):
+    """Run every benchmark.
+
+    Returns:
+    --------
+        results: (dict) benchmark name -> {'time': seconds per call, and
+        'evals': N_channels evaluations where applicable}
+    """
+    props = FlowProperties()
+    results = {}
+
+    flowdata = Flow(radius, PD, c, L, props)
+    results['compute_channels_from_guess'] = {
+        'time': time_call(lambda: flowdata.compute_channels_from_guess(5.0),
+                          repeat)}
+
+    for method in solvers:
+        evals = find_n_channels(Flow(radius, PD, c, L, props), method)
+        results['find_n_channels:' + method] = {
+            'time': time_call(lambda: find_n_channels(
+                Flow(radius, PD, c, L, props), method), repeat),
+            'evals': evals}
+        results['oned_flow_modeling:' + method] = {
+            'time': time_call(lambda: oned_flow_modeling(
+                Flow(radius, PD, c, L, props), method), repeat)}
+
+    for N in sweep_sizes:
+        for batch in (False, True):
+            name = 'sweep:N={0}:{1}'.format(N, 'batch' if batch else 'scalar')
+            sweep = ParametricSweep(N)
+            results[name] = {
+                'time': time_call(lambda: sweep.sweep_geometric_configs(
+                    radii, pds, L, c, props, batch=batch), repeat, 1),
+                'evals': sweep.solver_evals}
+
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Compare benchmark times against a baseline.
+
+    Arguments:
+    ----------
+        results: (dict) output of run_benchmarks
+        baseline: (dict) stored output of run_benchmarks
+        tolerance: (float) allowed fractional slowdown
+    Returns:
+    --------
+        regressions: (list) names of benchmarks slower than the baseline by
+        more than tolerance
+    """
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        ratio = results[name]['time'] / baseline[name]['time']
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = '  <-- REGRESSION'
+        print("{0:40s} {1:10.3e} s  x{2:6.2f} vs baseline{3}".format(
+            name, results[name]['time'], ratio, flag))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-sizes", type=int, nargs='+', default=[10, 50],
+                        help="sweep resolutions N to benchmark")
+    parser.add_argument("-repeat", type=int, default=5,
+                        help="timing repeats (best is reported)")
+    parser.add_argument("-save", type=str,
+                        help="write the results to this JSON file")
+    parser.add_argument("-baseline", type=str,
+                        help="compare the results against this JSON file")
+    parser.add_argument("-tolerance", type=float, default=0.2,
+                        help="allowed fractional slowdown vs the baseline")
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.repeat)
+
+    for name in sorted(results):
+        evals = results[name].get('evals', '')
+        print("{0:40s} {1:10.3e} s  {2}".format(name, results[name]['time'],
+                                                evals))
+
+    if args.save:
+        with open(args.save, 'w') as outfile:
+            json.dump({'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'results': results}, outfile, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)['results']
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
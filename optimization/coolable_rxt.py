@@ -31,9 +31,9 @@ def main():
     test = Flow(args.radius, args.PD, args.clad_t, args.core_z)
     oned_flow_modeling(test)
     # print results
-    data = test.__dict__
-    del data['fps']
-    data = {str(round(data[key], 3)) for key in sorted(data.keys())}
+    data = {key: getattr(test, key) for key in Flow.__slots__
+            if key != 'fps'}
+    data = {str(round(float(data[key]), 3)) for key in sorted(data.keys())}
     print(data)
 
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+"""Memoization Cache for 1D Flow Calculations.
+The power cycle model calls the reactor surrogate repeatedly with the same (or
+nearly the same) geometry and flow properties. This module stores the results
+of oned_flow_modeling in a bounded LRU cache keyed on the quantized inputs so
+repeated calls do not re-solve the flow problem.
+
+The following classes are contained in this module:
+    *FlowCache
+"""
+import math
+import os
+import pickle
+from collections import OrderedDict
+# Import TH functions
+from physical_constants import FlowProperties
+from ht_functions import Flow, flow_model, oned_flow_modeling
+
+
+class FlowCache:
+    """Bounded LRU cache of Flow results.
+
+    Inputs are quantized to `digits` significant digits (set from rtol), so
+    inputs that agree to within rtol share a cache entry.
+    """
+    # FlowProperties inputs that define a flow condition
+    prop_keys = ['m_dot', 'Q_therm', 'T', 'P', 'dp_limit']
+
+    def __init__(self, maxsize=4096, rtol=1e-9, path=None, method='newton'):
+        """Initialize the cache. If path is given and the file exists, the
+        stored cache is loaded.
+
+        Initialized Attributes:
+        -----------------------
+            maxsize: (int) maximum number of stored results
+            digits: (int) significant digits used to quantize the inputs
+            path: (str) file used to persist the cache between runs
+            method: (str) N_channels solver, see find_n_channels
+            hits: (int) number of cache hits
+            misses: (int) number of cache misses
+        """
+        self.maxsize = maxsize
+        self.digits = max(1, math.ceil(-math.log10(rtol)))
+        self.path = path
+        self.method = method
+        self.hits = 0
+        self.misses = 0
+        self.results = OrderedDict()
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _quantize(self, x):
+        """Round x to the cache's significant digits.
+        """
+        return float('{0:.{1}e}'.format(x, self.digits - 1))
+
+    def key(self, radius, PD, c, L, props):
+        """Build the hashable cache key for one set of inputs.
+
+        Returns:
+        --------
+            key: (tuple) quantized (radius, PD, c, L, m_dot, Q_therm, T, P,
+            dp_limit), property mode and number of axial nodes
+        """
+        inputs = [radius, PD, c, L] + [getattr(props, key)
+                                       for key in self.prop_keys]
+
+        return tuple(self._quantize(x) for x in inputs) +\
+            (props.mode, props.n_nodes)
+
+    def evaluate(self, radius, PD, c, L, props=None):
+        """Return the oned_flow_modeling results for one design, solving the
+        flow problem only on a cache miss.
+
+        Returns:
+        --------
+            results: (dict) Flow.savedata results for the design
+        """
+        if props is None:
+            props = FlowProperties()
+        key = self.key(radius, PD, c, L, props)
+
+        if key in self.results:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+
+        self.misses += 1
+        flowdata = flow_model(radius, PD, c, L, props)
+        oned_flow_modeling(flowdata, self.method)
+        results = {name: float(getattr(flowdata, name))
+                   for name in Flow.savedata}
+
+        self.results[key] = results
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+        return results
+
+    def save(self, path=None):
+        """Write the cached results to disk.
+        """
+        with open(path or self.path, 'wb') as cachefile:
+            pickle.dump({'digits': self.digits,
+                         'results': list(self.results.items())}, cachefile)
+
+    def load(self, path):
+        """Load cached results from disk. Entries stored with a different
+        quantization are discarded.
+        """
+        with open(path, 'rb') as cachefile:
+            stored = pickle.load(cachefile)
+        if stored['digits'] != self.digits:
+            return
+        self.results.update(stored['results'][-self.maxsize:])
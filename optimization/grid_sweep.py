@@ -0,0 +1,280 @@
+"""N-Dimensional Parametric Sweep.
+This module sweeps the 1D flow model over the Cartesian product of any of the
+geometric inputs (r, pd, L, c) and the FlowProperties inputs (m_dot, Q_therm,
+T, P, dp_limit) in one process. The sweep points are evaluated in chunks
+with FlowBatch and FlowPropertiesBatch, optionally split over a process
+pool, and the results are returned as a labeled N-D structured array.
+
+The following classes are contained in this module:
+    *GridSweep
+"""
+import argparse
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+# Import TH functions
+from physical_constants import FlowProperties, FlowPropertiesBatch, \
+    default_flow_inputs
+from ht_functions import Flow, sweep_chunk
+
+
+class GridSweep:
+    """Class to perform and store an N-D parametric sweep.
+
+    Every input is either fixed (a scalar) or swept (a 1-D sequence). The
+    swept inputs are the dimensions of data, in axis_names order.
+
+    Usage:
+        sweep = GridSweep(r=np.linspace(0.002, 0.01, 50),
+                          pd=np.linspace(1.1, 2.5, 50),
+                          L=[0.3, 0.5, 0.7], c=0.00031,
+                          m_dot=[0.5, 0.75, 1.0])
+        sweep.sweep()
+        best = sweep.min_mass(keep=('L', 'm_dot'))
+    """
+    geom_names = ['r', 'pd', 'L', 'c']
+    flow_names = ['m_dot', 'Q_therm', 'T', 'P', 'dp_limit']
+    axis_names = geom_names + flow_names
+    # one f8 field per saved Flow result
+    dtype = np.dtype({'names': list(Flow.savedata.keys()),
+                      'formats': ['f8']*len(Flow.savedata.keys())})
+
+    def __init__(self, mode='bulk', n_nodes=20, **axes):
+        """Initialize the sweep. r, pd, L and c are required; the flow
+        inputs default to the FlowProperties defaults.
+
+        Arguments:
+        ----------
+            mode: (str) FlowProperties mode, 'bulk' or 'axial'
+            n_nodes: (int) number of axial nodes in 'axial' mode
+            axes: (float or sequence) value(s) of every input in axis_names
+        Initialized Attributes:
+        -----------------------
+            values: (dict) input -> 1-D array of its values
+            dims: (list) names of the swept inputs (data dimensions)
+            coords: (dict) swept input -> 1-D array of its values
+            shape: (tuple) shape of data
+        """
+        unknown = set(axes) - set(self.axis_names)
+        if unknown:
+            raise ValueError("Unknown sweep inputs: " +
+                             ", ".join(sorted(unknown)))
+        self.mode = mode
+        self.n_nodes = n_nodes
+        self.values = {}
+        self.dims = []
+        for name in self.axis_names:
+            if name in self.geom_names and name not in axes:
+                raise ValueError("Missing sweep input: " + name)
+            value = axes.get(name, default_flow_inputs.get(name))
+            if np.ndim(value) > 0:
+                self.dims.append(name)
+            self.values[name] = np.atleast_1d(np.asarray(value, dtype=float))
+        self.coords = {name: self.values[name] for name in self.dims}
+        self.shape = tuple(len(self.coords[name]) for name in self.dims)
+        self.data = np.zeros(self.shape, dtype=self.dtype)
+
+    def flow_conditions(self):
+        """Generate every combination of the flow inputs.
+
+        Yields:
+        -------
+            idx: (tuple) indices of the combination on the flow axes
+            props: (FlowProperties) flow properties of the combination
+        """
+        flow_axes = [enumerate(self.values[name]) for name in self.flow_names]
+        for condition in itertools.product(*flow_axes):
+            idx, inputs = zip(*condition)
+            yield idx, FlowProperties(dict(zip(self.flow_names, inputs)),
+                                      self.mode, self.n_nodes)
+
+    def sweep(self, method='newton', workers=1, chunksize=None):
+        """Evaluate the flow model at every point of the sweep.
+
+        In bulk mode the whole Cartesian product is flattened and evaluated
+        in chunks, each with one FlowBatch and one FlowPropertiesBatch. In
+        axial mode every flow condition gets its own FlowProperties and its
+        geometry is evaluated in chunks.
+
+        Arguments:
+        ----------
+            method: (str) N_channels solver, see find_n_channels.
+            workers: (int) number of worker processes. If > 1, the chunks are
+            evaluated in a process pool. The results do not depend on the
+            number of workers.
+            chunksize: (int) sweep points per chunk (default: the number of
+            geometry points)
+        Modified Attributes:
+        --------------------
+            data: (ndarray) N-D structured array of results
+            solver_evals: (int) total batched N_channels evaluations
+        Returns:
+        --------
+            data: (ndarray) N-D structured array of results
+        """
+        full_shape = tuple(len(self.values[name]) for name in self.axis_names)
+        n_geom = int(np.prod(full_shape[:len(self.geom_names)]))
+        chunksize = chunksize or n_geom
+
+        results = np.zeros(int(np.prod(full_shape)), dtype=self.dtype)
+        self.solver_evals = 0
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                runs = [(where, pool.submit(sweep_chunk, *args, True, method))
+                        for where, args in self.chunks(chunksize)]
+                for where, run in runs:
+                    self._store(results, where, *run.result())
+        else:
+            for where, args in self.chunks(chunksize):
+                self._store(results, where, *sweep_chunk(*args, True, method))
+
+        self.data = results.reshape(self.shape)
+
+        return self.data
+
+    def chunk_points(self, names, start, stop):
+        """Get the points start:stop of the flattened (C order) grid of the
+        names inputs without building the full mesh.
+
+        Returns:
+        --------
+            points: (list) values of every input at the chunk's points
+        """
+        shape = tuple(len(self.values[name]) for name in names)
+        idx = np.unravel_index(np.arange(start, stop), shape)
+
+        return [self.values[name][i] for name, i in zip(names, idx)]
+
+    def chunks(self, chunksize):
+        """Generate the sweep chunks one at a time. In bulk mode the chunks
+        are contiguous ranges of the flattened (r, pd, L, c, m_dot, Q_therm,
+        T, P, dp_limit) grid. In axial mode the geometry grid is chunked for
+        every flow condition; flow conditions are the last axes, so each
+        chunk is a strided slice of the flattened results.
+
+        Yields:
+        -------
+            where: (slice) position of the chunk in the flattened results
+            args: (list) r, pd, L, c and flow properties of the chunk
+        """
+        full_shape = tuple(len(self.values[name]) for name in self.axis_names)
+        n_points = int(np.prod(full_shape))
+        n_geom = int(np.prod(full_shape[:len(self.geom_names)]))
+
+        if self.mode == 'bulk':
+            for start in range(0, n_points, chunksize):
+                stop = min(start + chunksize, n_points)
+                points = self.chunk_points(self.axis_names, start, stop)
+                props = FlowPropertiesBatch(dict(zip(self.flow_names,
+                                                     points[4:])))
+                yield slice(start, stop), points[:4] + [props]
+            return
+
+        n_flow = n_points // n_geom
+        for cond, (idx, props) in enumerate(self.flow_conditions()):
+            for start in range(0, n_geom, chunksize):
+                stop = min(start + chunksize, n_geom)
+                points = self.chunk_points(self.geom_names, start, stop)
+                yield slice(start*n_flow + cond, stop*n_flow, n_flow), \
+                    points + [props]
+
+    def _store(self, results, where, rows, n_evals):
+        """Copy an evaluated chunk into the flattened results.
+
+        Modified Attributes:
+        --------------------
+            solver_evals: (int) total batched N_channels evaluations
+        """
+        self.solver_evals += n_evals
+        for key in self.dtype.names:
+            results[key][where] = rows[key]
+
+    def min_mass(self, keep=()):
+        """Reduce the results to the minimum mass over every dimension that
+        is not kept.
+
+        Arguments:
+        ----------
+            keep: (tuple) names of the dimensions to keep, in output order
+        Returns:
+        --------
+            best: (dict) 'mass': min mass for every combination of the kept
+            dimensions; 'index': index of the minimum in data; and for every
+            reduced dimension, its value at the minimum
+        """
+        keep = list(keep)
+        reduced = [name for name in self.dims if name not in keep]
+        order = [self.dims.index(name) for name in keep + reduced]
+        mass = np.transpose(self.data['mass'], order)
+        kept_shape = mass.shape[:len(keep)]
+        mass = mass.reshape(kept_shape + (-1,))
+
+        flat = np.argmin(np.where(np.isnan(mass), np.inf, mass), axis=-1)
+        best = {'mass': np.take_along_axis(mass, flat[..., None],
+                                           axis=-1)[..., 0]}
+        reduced_idx = ()
+        if reduced:
+            reduced_idx = np.unravel_index(flat, tuple(len(self.coords[name])
+                                                       for name in reduced))
+        kept_idx = np.indices(kept_shape)
+        index = [None]*len(self.dims)
+        for i, name in enumerate(keep):
+            index[self.dims.index(name)] = kept_idx[i]
+        for i, name in enumerate(reduced):
+            index[self.dims.index(name)] = reduced_idx[i]
+            best[name] = self.coords[name][reduced_idx[i]]
+        best['index'] = tuple(index)
+
+        return best
+
+    def disp_min_mass(self, keep=()):
+        """Display the minimum mass configuration for every combination of the
+        kept dimensions.
+        """
+        best = self.min_mass(keep)
+        reduced = [name for name in self.dims if name not in keep]
+        outstring = "N-D Thermal Hydraulics Sweep Results:\n"
+        for idx in np.ndindex(best['mass'].shape):
+            labels = ["{0} = {1:g}".format(name, self.coords[name][i])
+                      for name, i in zip(keep, idx)]
+            design = ["{0} = {1:g}".format(name, best[name][idx])
+                      for name in reduced]
+            outstring += ", ".join(labels) + (": " if labels else "") +\
+                "min mass = " + str(round(best['mass'][idx], 3)) +\
+                " [kg] at " + ", ".join(design) + "\n"
+        print(outstring.rstrip("\n"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-axis", nargs=4, action='append', default=[],
+                        metavar=('NAME', 'LOWER', 'UPPER', 'STEPS'),
+                        help="swept input, e.g. -axis L 0.3 0.7 5")
+    parser.add_argument("-fix", nargs=2, action='append', default=[],
+                        metavar=('NAME', 'VALUE'),
+                        help="fixed input, e.g. -fix c 0.00031")
+    parser.add_argument("-keep", type=str, nargs='+', default=[],
+                        help="dimensions kept in the min mass table")
+    parser.add_argument("-solver", type=str, default='newton',
+                        choices=['newton', 'fixed-point'],
+                        help="N_channels solver")
+    parser.add_argument("-workers", type=int, default=1,
+                        help="number of parallel sweep processes")
+    parser.add_argument("-axial", type=int, default=0,
+                        help="solve the axially discretized model on " +\
+                             "this many nodes instead of the bulk model")
+
+    args = parser.parse_args()
+
+    axes = {name: float(value) for name, value in args.fix}
+    for name, lower, upper, steps in args.axis:
+        axes[name] = np.linspace(float(lower), float(upper), int(steps))
+    if args.axial:
+        sweep = GridSweep('axial', args.axial, **axes)
+    else:
+        sweep = GridSweep(**axes)
+    sweep.sweep(args.solver, args.workers)
+    sweep.disp_min_mass(args.keep)
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,20 @@
 # Other Imports
+import itertools
+import json
 import math
 import numpy as np
 import operator
+import os
 import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from scipy.optimize import minimize, minimize_scalar
 # Import physical constants
 from physical_constants import const, FlowProperties
 
 
-def oned_flow_modeling(analyze_flow):
+def oned_flow_modeling(analyze_flow, method='newton', guess=None):
     """1D calculation.
     This function produces a valid, coolable reactor design given the following
     arguments:
@@ -17,15 +23,23 @@ def oned_flow_modeling(analyze_flow):
     ----------
         analyze_flow (flow) Flow object with methods and attributes to calculate
         N_channels.
+        method (str) (opt): N_channels solver, see find_n_channels.
+        guess (float) (opt): warm start for the solver, e.g. the N_thermal of
+        a neighboring design point.
     Returns:
     --------
-        None
+        n_evals (int): number of N_channels evaluations used by the solver
     """
-    find_n_channels(analyze_flow)
+    n_evals = find_n_channels(analyze_flow, method, guess)
+    # the thermal solution is the warm start for neighboring points; the
+    # dp-constrained N_channels is not a solution of the thermal problem
+    analyze_flow.N_thermal = analyze_flow.N_channels
     analyze_flow.adjust_dp()
     analyze_flow.calc_reactor_mass()
     analyze_flow.calc_aspect_ratio()
 
+    return n_evals
+
 
 def _calc_n_channels_error(guess, flowiteration):
     """Calculate squared error between guess value and N channels for all
@@ -44,29 +58,167 @@ def _calc_n_channels_error(guess, flowiteration):
     return flowiteration.compute_channels_from_guess(guess)
 
 
-def find_n_channels(flow):
-    """Perform error minimization. Using scipy's optimization package, call
-    the _error function until the error is minimized to a set tolerance.
+def find_n_channels(flow, method='newton', guess=None, warm_bracket=4.0):
+    """Solve for the N_channels that is consistent with its own guess value
+    (guess_channels = N_channels).
+
+    Available solvers:
+        'newton': Newton iteration using the analytic slope of N_channels
+            w.r.t. the guess (see _newton_n_channels). Default.
+        'fixed-point': successive substitution guess <- N_channels with
+            Aitken (Steffensen) acceleration, see _fixed_point_n_channels.
+        'bounded': legacy scipy minimize_scalar error minimization over the
+            (1, 1e9) bracket. Only available for scalar Flow objects.
+
+    There is no closed-form solution because h_bar ~ guess^-0.8 makes the
+    consistency condition a non-integer power equation.
+
+    A warm start (e.g. the solution of a neighboring sweep point) replaces
+    the initial guess of 1 for 'newton' and 'fixed-point'. For 'bounded' it
+    narrows the bracket to (guess/warm_bracket, guess*warm_bracket); if the
+    minimum lands on an edge of the narrowed bracket, the solve is repeated
+    over the full bracket.
 
     Arguments:
     ----------
         flow: (class) Flow object. Contains attributes and
         methods required to perform an N_channels calculation for a single
         geometry (r, PD, L, c)
+        method: (str) solver to use
+        guess: (float or ndarray) warm start for N_channels (default: none)
+        warm_bracket: (float) bracket width factor of a warm 'bounded' solve
     Returns:
     --------
-        none
+        n_evals: (int) number of compute_channels_from_guess evaluations
+    """
+    start = np.ones_like(flow.r_channel)
+    if guess is not None:
+        start = start * guess
+    if method == 'newton':
+        return _newton_n_channels(flow, start)
+    if method == 'fixed-point':
+        return _fixed_point_n_channels(flow, start)
+    if method == 'bounded':
+        if np.ndim(flow.r_channel) > 0:
+            raise ValueError("The 'bounded' solver requires a scalar Flow.")
+        full_bounds = (1, 1e9)
+        n_evals = 0
+        if guess is not None:
+            bounds = (max(full_bounds[0], guess / warm_bracket),
+                      min(full_bounds[1], guess * warm_bracket))
+            res = minimize_scalar(_calc_n_channels_error, bounds=bounds,
+                                  args=(flow), method='Bounded',
+                                  options={'xatol': 1e-3})
+            n_evals += res.nfev
+            # a minimum on an inner edge means the bracket was too narrow
+            on_edge = [abs(res.x - edge) < 1e-2 for edge in bounds
+                       if edge not in full_bounds]
+            if not any(on_edge):
+                return n_evals
+        res = minimize_scalar(_calc_n_channels_error, bounds=full_bounds,
+                              args=(flow), method='Bounded',
+                              options={'xatol': 1e-3})
+        return n_evals + res.nfev
+
+    raise ValueError("Unknown N_channels solver: '{0}'".format(method))
+
+
+def _newton_n_channels(flow, guess=1.0, rtol=1e-10, maxiter=50):
+    """Solve guess_channels = N_channels with Newton's method.
+
+    N_channels depends on the guess only through the convective resistance
+    (h_bar ~ guess^-0.8 from Dittus-Boelter), so the derivative of N_channels
+    w.r.t. the guess is available from the resistance network:
 
+        dln(N)/dln(guess) = 0.8 * R_conv / R_tot
+
+    The iteration is performed on ln(guess) - ln(N_channels), whose slope is
+    bounded in [0.2, 1], so it converges from any positive initial guess.
+    Only element-wise arithmetic is used, so this works for both Flow and
+    FlowBatch objects.
+
+    Arguments:
+    ----------
+        flow: (Flow or FlowBatch) object to solve
+        guess: (float or ndarray) initial guess for N_channels
+        rtol: (float) relative convergence tolerance on guess - N_channels
+        maxiter: (int) maximum number of Newton steps
+    Returns:
+    --------
+        n_evals: (int) number of compute_channels_from_guess evaluations
     """
-    res = minimize_scalar(_calc_n_channels_error, bounds=(1, 1e9), args=(flow),
-                          method='Bounded', options={'xatol': 1e-3})
+    n_evals = 0
+    for n_evals in range(1, maxiter + 1):
+        flow.compute_channels_from_guess(guess)
+        residual = guess - flow.N_channels
+        converged = np.abs(residual) <= rtol * np.abs(flow.N_channels)
+        if np.all(converged):
+            break
+        slope = 1 - 0.8 * flow.R_conv / flow.R_tot
+        # hold converged points so results do not depend on batch contents
+        step = np.where(converged, 0, np.log(flow.N_channels / guess) / slope)
+        guess = guess * np.exp(step)
+
+    return n_evals
+
+
+def _fixed_point_n_channels(flow, guess=1.0, rtol=1e-10, maxiter=500):
+    """Solve guess_channels = N_channels by successive substitution,
+    accelerated with Aitken's delta-squared extrapolation (Steffensen's
+    method) on ln(guess).
+
+    In ln(guess), the substitution ln(guess) <- ln(N_channels) contracts at
+    the rate r = 0.8 * R_conv / R_tot, which changes slowly with the guess.
+    Every two substitution steps estimate r from their ratio and jump to the
+    limit of the geometric sequence, ln(N) + (ln(N) - ln(guess))*r/(1 - r).
+    The estimate is clipped to the physical range [0, 0.8].
+
+    Arguments:
+    ----------
+        flow: (Flow or FlowBatch) object to solve
+        guess: (float or ndarray) initial guess for N_channels
+        rtol: (float) relative convergence tolerance on guess - N_channels
+        maxiter: (int) maximum number of compute_channels_from_guess
+        evaluations
+    Returns:
+    --------
+        n_evals: (int) number of compute_channels_from_guess evaluations
+    """
+    def substitute(lnguess):
+        """Evaluate one substitution step; converged points are flagged."""
+        flow.compute_channels_from_guess(np.exp(lnguess))
+        residual = np.exp(lnguess) - flow.N_channels
+        return np.abs(residual) <= rtol * np.abs(flow.N_channels)
+
+    n_evals = 0
+    lnguess = np.log(guess)
+    while n_evals < maxiter:
+        converged = substitute(lnguess)
+        n_evals += 1
+        if np.all(converged) or n_evals == maxiter:
+            break
+        # hold converged points so results do not depend on batch contents
+        ln1 = np.where(converged, lnguess, np.log(flow.N_channels))
+        converged = converged | substitute(ln1)
+        n_evals += 1
+        if np.all(converged):
+            break
+        ln2 = np.log(flow.N_channels)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = (ln2 - ln1) / (ln1 - lnguess)
+        rate = np.clip(np.where(np.isfinite(rate), rate, 0), 0, 0.8)
+        lnguess = np.where(converged, ln1,
+                           ln2 + (ln2 - ln1) * rate / (1 - rate))
+
+    return n_evals
 
 
 class Flow:
     """ Perform 1D Flow Analysis
 
     This class contains the required methods to perform a 1D coupled heat
-    transfer/fluid flow problem on a CERMET Flow Channel.
+    transfer/fluid flow problem on a CERMET Flow Channel. The methods use
+    NumPy functions, so FlowBatch evaluates them on arrays of geometries.
     """
     savedata = {'mass': ("Total Fuel Mass", "m [kg]"),
                 'N_channels': ("Number of Fuel Channels", "N Channels [-]"),
@@ -77,35 +229,50 @@ class Flow:
                 'v': ("Flow Velocity", "v [m/s]"),
                 'AR': ("Approximate Core Aspect Ratio", "AR [-]")
                }
+    # True for models that resolve axial-mode flow properties node by node
+    axial_model = False
 
     ################################
     # UNIT SYSTEM: m, kg, J, W, Pa #
     ################################
 
-    # geometric attributes
-    r_channel = 0
-    c = 0  # clad thickness
-    pitch = 0  # fuel pitch (center to side of hex)
-    L = 0  # reactor length
-    Vol_fuel = 0  # fuel volume
-    mass = 0  # fuel mass
-    A_fuel = 0  # fuel cross-sectional area
-    A_flow = 0  # flow cross-sectional area
-    guess_channels = 0  # guess value to number of fuel channels
-    N_channels = 0  # number of required fuel channels for given flow conditions
-
-    # flow parameters
-    D_e = 0  # hydraulic diameter
-    v = 0  # flow velocity
-    dp = 0  # channel pressure drop
-
-    # heat transfer attributes
-    h_bar = 0  # average heat transfer coefficient
-    f = 0  # friction factor
-
-    # heat generation
-    q_bar = 0  # axially-averaged volumetric generation
-    q_per_channel = 0  # generation per fuel channel
+    # per-instance state. A sweep creates one Flow per mesh point, so the
+    # attributes are slots instead of a per-instance __dict__.
+    __slots__ = (
+        # geometric attributes
+        'r_channel',  # coolant channel radius
+        'pd_ratio',  # pitch to coolant channel diameter ratio
+        'c',  # clad thickness
+        'pitch',  # fuel pitch (center to side of hex)
+        'L',  # reactor length
+        'r_i',  # inner radius of the equivalent fuel annulus
+        'r_o',  # outer radius of the equivalent fuel annulus
+        'Vol_fuel',  # fuel volume
+        'mass',  # fuel mass
+        'A_fuel',  # fuel cross-sectional area
+        'A_flow',  # flow cross-sectional area
+        'guess_channels',  # guess value to number of fuel channels
+        'N_channels',  # number of required fuel channels for given flow conditions
+        'N_thermal',  # N_channels before the dp constraint is applied
+        'AR',  # core aspect ratio
+
+        # flow parameters
+        'fps',  # FlowProperties
+        'D_e',  # hydraulic diameter
+        'v',  # flow velocity
+        'dp',  # channel pressure drop
+        'dp_limited',  # True if the dp constraint set N_channels
+
+        # heat transfer attributes
+        'dT',  # temperature drop fuel centerline -> coolant
+        'h_bar',  # average heat transfer coefficient
+        'f',  # friction factor
+        'R_fuel', 'R_clad', 'R_conv', 'R_tot',  # resistance network
+
+        # heat generation
+        'q_bar',  # axially-averaged volumetric generation
+        'q_per_channel',  # generation per fuel channel
+    )
 
     def __init__(self, radius, PD, c, L, flowprops=FlowProperties()):
         """Initialize the flow iteration class.
@@ -117,6 +284,11 @@ class Flow:
             pitch: fuel thickness (minor axis of hexagon) [m]
             L: length of core [m]
         """
+        if flowprops.mode == 'axial' and not self.axial_model:
+            # the bulk model would mix node-averaged properties with the
+            # bulk peaking factor and single-node dp
+            raise ValueError("Axial-mode flow properties require "
+                             "AxialFlowBatch, see flow_model/flow_batch.")
         self.pd_ratio = PD
         self.r_channel = radius
         self.c = c
@@ -164,11 +336,11 @@ class Flow:
         # calculate Reynolds Number
         Re = self.fps.rho * self.v * self.D_e / self.fps.mu
         # Dittus-Boelter equation (9-22) from El-Wakil
-        Nu = 0.023*math.pow(Re, 0.8)*math.pow(self.fps.Pr, 0.4)
+        Nu = 0.023*np.power(Re, 0.8)*np.power(self.fps.Pr, 0.4)
         # heat transfer coefficient
         self.h_bar = Nu * self.fps.k_cool / self.D_e
         # Darcy-Weisbach friction factor for pressure drop correlation El Wakil (9-4)
-        self.f = 0.184 / math.pow(Re, 0.2)
+        self.f = 0.184 / np.power(Re, 0.2)
 
     def get_q_per_channel(self):
         """Calculate achievable average volumetric generation:
@@ -195,17 +367,18 @@ class Flow:
         
         # Use resistance network to calculate q_trip_max
         # resistance to conduction in fuel
-        R_total = (self.r_o**2 / (4*const['k_fuel'])) *\
-                 ((self.r_i/self.r_o)**2 - 2*math.log(self.r_i/self.r_o) - 1)
+        self.R_fuel = (self.r_o**2 / (4*self.fps.k_fuel)) *\
+                 ((self.r_i/self.r_o)**2 - 2*np.log(self.r_i/self.r_o) - 1)
         # resistance to conduction in clad
-        R_total += (self.r_o**2)/2 * (1-(self.r_i/self.r_o)**2) *\
-                    math.log(self.r_i/(self.r_i-self.c)) / const['k_clad']
+        self.R_clad = (self.r_o**2)/2 * (1-(self.r_i/self.r_o)**2) *\
+                    np.log(self.r_i/(self.r_i-self.c)) / const['k_clad']
         # resistance to convection clad -> coolant
-        R_total += (self.r_o**2)/2 * (1-(self.r_i/self.r_o)**2) *\
+        self.R_conv = (self.r_o**2)/2 * (1-(self.r_i/self.r_o)**2) *\
                   1 / (self.h_bar*(self.r_i - self.c))
+        self.R_tot = self.R_fuel + self.R_clad + self.R_conv
 
         # calculate centerline volumetric generation
-        q_trip_max = self.dT / R_total
+        q_trip_max = self.dT / self.R_tot
 
         # consider axial flux variation
         self.q_bar = q_trip_max * 2 / math.pi
@@ -232,16 +405,28 @@ class Flow:
         adjusts N_channels to the min N_channels that satisfies the dp
         constraint.
 
+        The dp-constrained N_channels is projected in one step (see
+        get_dp_constrained_Nchannels), so the flow is re-characterized once.
+
         Modified Attributes:
         --------------------
             guess_channels: guess number of fuel channels [-]
             N_channels: number of fuel channels [-]
+            dp_limited: True if the dp constraint set N_channels [-]
         """
 
         self.calc_dp()
-        while self.dp > self.fps.dp_limit:
-            # set N_channels and guess_channels
-            self.guess_channels = self.get_dp_constrained_Nchannels()
+        self.dp_limited = self.dp > self.fps.dp_limit
+        if not self.dp_limited:
+            return
+        # set N_channels and guess_channels
+        self.guess_channels = self.get_dp_constrained_Nchannels()
+        self.N_channels = self.guess_channels
+        self.characterize_flow()
+        self.calc_dp()
+        if self.dp > self.fps.dp_limit:
+            # round-off in an exactly integer projection
+            self.guess_channels += 1
             self.N_channels = self.guess_channels
             self.characterize_flow()
             self.calc_dp()
@@ -251,6 +436,11 @@ class Flow:
         calculates the required number of channels to meet the pressure drop
         constraint (set by the power cycle).
 
+        With v ~ 1/N_channels and f = 0.184*Re^-0.2 ~ N_channels^0.2, the
+        Darcy pressure drop scales as dp ~ f*v^2 ~ N_channels^-1.8. The
+        channel count that meets dp_limit exactly therefore follows from the
+        current guess and dp without iterating on f.
+
         Arguments:
         ----------
             self: Flow object [-]
@@ -258,10 +448,8 @@ class Flow:
         --------
             req_channels: Min N_channels required to meet dp constraint [-].
         """
-        v_req = math.sqrt(2*self.D_e * self.fps.dp_limit /
-                          (self.f * self.L * self.fps.rho))
-        req_channels = math.ceil(
-            self.fps.m_dot / (self.A_flow * self.fps.rho * v_req))
+        req_channels = np.ceil(self.guess_channels *
+                               (self.dp / self.fps.dp_limit)**(1/1.8))
 
         return req_channels
 
@@ -273,9 +461,22 @@ class Flow:
             AR: core aspect ratio [-]
         """
         total_area = (self.A_fuel + self.A_flow) * self.N_channels
-        equivalent_radius = math.sqrt(total_area / math.pi)
+        equivalent_radius = np.sqrt(total_area / math.pi)
         self.AR = self.L / (2*equivalent_radius)
 
+    def save_results(self, columns, idx=Ellipsis):
+        """Copy the savedata results into preallocated result columns, e.g.
+        the fields of a structured array. Works for FlowBatch objects as well.
+
+        Arguments:
+        ----------
+            columns: (ndarray or dict) structured array of results, or result
+            name -> column array
+            idx: (int, slice or tuple) position of the results in the columns
+        """
+        for key in self.savedata:
+            columns[key][idx] = getattr(self, key)
+
     def compute_channels_from_guess(self, inp_guess):
         """Perform single 1D heat flow calculation. This method calls the
         required methods to perform one iteration of the calculation.
@@ -307,66 +508,743 @@ class Flow:
         self.mass = self.Vol_fuel * const['rho_fuel']
 
 
+class FlowBatch(Flow):
+    """ Perform 1D Flow Analysis on arrays of geometries
+
+    This class evaluates the Flow model for many geometries at once. The
+    geometric inputs are broadcast against each other (and against the arrays
+    of a FlowPropertiesBatch) and every Flow method is performed as a NumPy
+    array operation instead of one Flow object per point. The physics methods
+    are inherited from Flow; only adjust_dp and the solver entry point are
+    specific to arrays.
+    """
+    # sensitivities: differentiated results and the inputs they depend on
+    sens_outputs = ['N_channels', 'mass', 'dp', 'AR']
+    sens_inputs = ['r', 'PD', 'L', 'c', 'm_dot', 'Q_therm', 'T', 'dp_limit']
+
+    def __init__(self, radius, PD, c, L, flowprops=None):
+        """Initialize the batched flow class.
+
+        Initialized Attributes:
+        --------------------
+            r_channel: (ndarray) radius of coolant channel [m]
+            c: (ndarray) cladding thickness [m]
+            pitch: (ndarray) fuel thickness (minor axis of hexagon) [m]
+            L: (ndarray) length of core [m]
+        """
+        if flowprops is None:
+            flowprops = FlowProperties()
+        # complex inputs are kept for complex-step sensitivities
+        dtype = np.result_type(float, radius, PD, c, L)
+        # geometry is also broadcast against batched flow properties
+        radius, PD, c, L, _ = np.broadcast_arrays(
+            *[np.asarray(x, dtype=dtype) for x in (radius, PD, c, L)],
+            np.zeros(np.shape(flowprops.T)))
+        super().__init__(radius, PD, c, L, flowprops)
+
+    def adjust_dp(self):
+        """Check for pressure constraint. Only the geometries that violate the
+        dp constraint are moved to their dp-constrained N_channels, with one
+        projection for the whole batch. See Flow.adjust_dp.
+
+        Modified Attributes:
+        --------------------
+            guess_channels: guess number of fuel channels [-]
+            N_channels: number of fuel channels [-]
+            dp_limited: True where the dp constraint set N_channels [-]
+        """
+        self.calc_dp()
+        over = self.dp > self.fps.dp_limit
+        self.dp_limited = over
+        if not np.any(over):
+            return
+        req_channels = self.get_dp_constrained_Nchannels()
+        self.guess_channels = np.where(over, req_channels, self.guess_channels)
+        self.N_channels = np.where(over, req_channels, self.N_channels)
+        self.characterize_flow()
+        self.calc_dp()
+        over = self.dp > self.fps.dp_limit
+        if np.any(over):
+            # round-off in an exactly integer projection
+            self.guess_channels = np.where(over, self.guess_channels + 1,
+                                           self.guess_channels)
+            self.N_channels = np.where(over, self.guess_channels,
+                                       self.N_channels)
+            self.characterize_flow()
+            self.calc_dp()
+
+    def solve(self, method='newton'):
+        """Perform the full 1D calculation (see oned_flow_modeling) for every
+        geometry in the batch.
+
+        Returns:
+        --------
+            n_evals: (int) number of batched N_channels evaluations
+        """
+        return oned_flow_modeling(self, method)
+
+    def _fixed_channel_outputs(self, N_channels, geom, props):
+        """Evaluate the model outputs at a fixed N_channels, without solving.
+        Every operation accepts complex inputs.
+
+        Returns:
+        --------
+            outputs: (dict) ln of the N_channels implied by the flow, ln dp,
+            ln dp_limit, mass and AR
+        """
+        flow = FlowBatch(geom['r'], geom['PD'], geom['c'], geom['L'], props)
+        flow.guess_channels = N_channels
+        flow.characterize_flow()
+        flow.get_q_per_channel()
+        outputs = {'lnN_calc' : np.log(flow.N_channels)}
+        flow.calc_dp()
+        flow.N_channels = N_channels
+        flow.calc_reactor_mass()
+        flow.calc_aspect_ratio()
+        outputs.update({'lndp' : np.log(flow.dp),
+                        'lndp_limit' : np.log(props.dp_limit),
+                        'mass' : flow.mass, 'AR' : flow.AR})
+
+        return outputs
+
+    def sensitivities(self):
+        """Calculate the derivatives of N_channels, mass, dp and AR w.r.t.
+        every geometry and flow input after solve(), without re-solving.
+
+        The solution is an implicit function of the inputs: either
+        N_channels = Q_therm / q_per_channel(N_channels) or, for dp-limited
+        designs, dp(N_channels) = dp_limit. Its derivatives follow from the
+        implicit function theorem. The required partial derivatives come from
+        complex-step evaluations of the model at the fixed solution, which are
+        exact to machine precision. This takes one non-iterative evaluation per
+        input instead of two full solves per input for central differences.
+
+        The dp-limited N_channels is differentiated as the continuous count
+        that meets dp_limit exactly (the ceil is ignored), so the dp of those
+        designs has a derivative of 1 w.r.t. dp_limit and 0 otherwise.
+        Bulk-mode flow properties only.
+
+        Returns:
+        --------
+            sens: (dict) output -> input -> derivative array, for the
+            outputs in sens_outputs and inputs in sens_inputs
+        """
+        if self.fps.mode != 'bulk':
+            raise ValueError("Sensitivities require bulk-mode properties.")
+        geom = {'r' : self.r_channel, 'PD' : self.pd_ratio, 'c' : self.c,
+                'L' : self.L}
+        limited = np.asarray(self.dp_limited)
+        # continuous dp-limited N_channels (dp ~ N_channels^-1.8)
+        N_solved = np.where(limited, self.N_channels *
+                            (self.dp / self.fps.dp_limit)**(1/1.8),
+                            self.N_channels)
+        lnN = np.log(N_solved)
+
+        partials = {}
+        for name in ['lnN'] + self.sens_inputs:
+            perturbed = dict(geom)
+            props = self.fps
+            if name == 'lnN':
+                step = 1e-20
+                N_channels = np.exp(lnN + 1j*step)
+            else:
+                N_channels = N_solved
+                if name in geom:
+                    step = 1e-20 * np.maximum(np.abs(geom[name]), 1e-300)
+                    perturbed[name] = geom[name] + 1j*step
+                else:
+                    step = 1e-20 * np.abs(getattr(props, name))
+                    props = props.perturbed(name, 1j*step)
+            outputs = self._fixed_channel_outputs(N_channels, perturbed, props)
+            partials[name] = {key: np.imag(value) / step
+                              for key, value in outputs.items()}
+
+        # residual of the active condition and its slope w.r.t. ln(N)
+        slope = np.where(limited, partials['lnN']['lndp'],
+                         1 - partials['lnN']['lnN_calc'])
+        dp = np.exp(self._fixed_channel_outputs(N_solved, geom,
+                                                self.fps)['lndp'])
+        sens = {key: {} for key in self.sens_outputs}
+        for name in self.sens_inputs:
+            grad = partials[name]
+            residual = np.where(limited, grad['lndp'] - grad['lndp_limit'],
+                                -grad['lnN_calc'])
+            dlnN = -residual / slope
+            sens['N_channels'][name] = N_solved * dlnN
+            for key in ['mass', 'AR']:
+                sens[key][name] = grad[key] + partials['lnN'][key] * dlnN
+            sens['dp'][name] = dp * (grad['lndp'] +
+                                     partials['lnN']['lndp'] * dlnN)
+
+        return sens
+
+
+class AxialFlowBatch(FlowBatch):
+    """ Perform axially discretized 1D Flow Analysis on arrays of geometries
+
+    The channel is split into the axial nodes of an axial-mode FlowProperties
+    (see FlowProperties.axial_properties). Coolant properties, h, friction
+    factor and the local generation limit are evaluated at every node, and
+    the pressure drop is summed over the nodes. Nodes are the last array
+    axis, so all nodes of all geometries are evaluated in one NumPy operation.
+
+    The generation follows the chopped-cosine shape sin(pi z/L). Its peak is
+    set by the node where the fuel centerline reaches T_center first, rather
+    than by the bulk coolant temperature and the 2/pi shape factor.
+    """
+    axial_model = True
+
+    def __init__(self, radius, PD, c, L, flowprops=None, n_nodes=None):
+        """Initialize the axially discretized flow class. Bulk-mode (or
+        missing) flow properties are replaced by axial-mode properties with
+        the same flow inputs.
+
+        Initialized Attributes:
+        --------------------
+            n_nodes: (int) number of axial nodes
+            shape: (ndarray) relative generation at the nodes [-]
+        """
+        if flowprops is None:
+            flowprops = FlowProperties()
+        if flowprops.mode != 'axial' or \
+                (n_nodes and n_nodes != flowprops.n_nodes):
+            flowprops = FlowProperties({key: getattr(flowprops, key) for key
+                                        in ['m_dot', 'Q_therm', 'T', 'P',
+                                            'dp_limit']},
+                                       'axial', n_nodes or flowprops.n_nodes)
+        super().__init__(radius, PD, c, L, flowprops)
+        self.n_nodes = self.fps.n_nodes
+        self.shape = np.sin(math.pi * self.fps.z_frac)
+
+    def characterize_flow(self):
+        """Calculate the flow parameters at every axial node.
+
+        Modified Attributes:
+        --------------------
+            v_z, h_z, f_z: (ndarray) node velocity [m/s], heat transfer
+            coefficient [W/m^2-K] and friction factor [-]
+            v, h_bar, f: (ndarray) axial averages
+        """
+        nodes = self.fps.axial
+        G_dot = self.fps.m_dot / (self.A_flow * self.guess_channels)
+        G_dot = np.asarray(G_dot)[..., None]
+        D_e = self.D_e[..., None]
+        self.v_z = G_dot / nodes['rho']
+        Re = G_dot * D_e / nodes['mu']
+        Nu = 0.023*np.power(Re, 0.8)*np.power(nodes['Pr'], 0.4)
+        self.h_z = Nu * nodes['k_cool'] / D_e
+        self.f_z = 0.184 / np.power(Re, 0.2)
+        self.v = self.v_z.mean(axis=-1)
+        self.h_bar = self.h_z.mean(axis=-1)
+        self.f = self.f_z.mean(axis=-1)
+
+    def get_q_per_channel(self):
+        """Calculate the peak generation allowed by every node and the
+        resulting generation per channel.
+
+        Modified Attributes:
+        --------------------
+            R_fuel, R_clad: node conduction resistances [W/K]
+            R_conv, R_tot: resistance terms at the limiting node [W/K]
+            limit_node: (ndarray) index of the limiting node
+            q_peak: (ndarray) peak volumetric generation [W/m^3]
+            q_bar: (ndarray) axially-averaged volumetric generation [W/m^3]
+            q_per_channel: (ndarray) total generation in fuel channel [W]
+            N_channels: (ndarray) required channels for desired Q [-]
+        """
+        nodes = self.fps.axial
+        r_i, r_o = self.r_i[..., None], self.r_o[..., None]
+        c = self.c[..., None]
+        self.R_fuel = (r_o**2 / (4*nodes['k_fuel'])) *\
+                 ((r_i/r_o)**2 - 2*np.log(r_i/r_o) - 1)
+        self.R_clad = (r_o**2)/2 * (1-(r_i/r_o)**2) *\
+                    np.log(r_i/(r_i-c)) / const['k_clad']
+        R_conv = (r_o**2)/2 * (1-(r_i/r_o)**2) * 1 / (self.h_z*(r_i - c))
+        R_tot = self.R_fuel + self.R_clad + R_conv
+
+        # local generation limit, relative to the power shape
+        q_limit = (const['T_center'] - self.fps.T_axial) / (R_tot * self.shape)
+        self.limit_node = np.argmin(q_limit, axis=-1)
+        pick = self.limit_node[..., None]
+        self.q_peak = np.take_along_axis(q_limit, pick, axis=-1)[..., 0]
+        self.R_conv = np.take_along_axis(R_conv, pick, axis=-1)[..., 0]
+        self.R_tot = np.take_along_axis(R_tot, pick, axis=-1)[..., 0]
+
+        self.q_bar = self.q_peak * self.shape.mean()
+        self.q_per_channel = self.q_bar * self.A_fuel * self.L
+        self.N_channels = self.fps.Q_therm / self.q_per_channel
+
+    def calc_dp(self):
+        """Sum the Darcy pressure drop over the axial nodes.
+
+        Modified Attributes:
+        --------------------
+            dp: core pressure drop [Pa]
+        """
+        dz = self.L / self.n_nodes
+        self.dp = dz * np.sum(self.f_z * self.fps.axial['rho'] *
+                              self.v_z**2, axis=-1) / (2*self.D_e)
+
+
+def pareto_front(costs, blocksize=1024):
+    """Find the non-dominated points of a cost matrix (all costs minimized)
+    with a sorting-based sweep instead of O(n^2) pairwise comparisons.
+
+    The points are sorted lexicographically, so a point can only be
+    dominated by points before it. With two objectives a point is
+    non-dominated if its second cost is below the running minimum of the
+    earlier points (O(n log n)). With more objectives the sorted points are
+    checked block by block against the front found so far and against the
+    earlier points of their block. Of several
+    identical points only the first is kept; non-finite points are skipped.
+
+    Arguments:
+    ----------
+        costs: (ndarray) costs [points x objectives]
+        blocksize: (int) points checked at once against the front
+    Returns:
+    --------
+        idx: (ndarray) indices of the Pareto-optimal points, sorted by the
+        first objective
+    """
+    costs = np.asarray(costs, dtype=float)
+    finite = np.flatnonzero(np.all(np.isfinite(costs), axis=1))
+    # lexsort sorts by its last key first
+    order = finite[np.lexsort(costs[finite].T[::-1])]
+    sorted_costs = costs[order]
+
+    if costs.shape[1] == 1:
+        return order[:1]
+    if costs.shape[1] == 2:
+        prior_min = np.minimum.accumulate(sorted_costs[:, 1])
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = sorted_costs[1:, 1] < prior_min[:-1]
+        return order[keep]
+
+    keep = np.zeros(len(order), dtype=bool)
+    for start in range(0, len(order), blocksize):
+        front = sorted_costs[:start][keep[:start]]
+        block = sorted_costs[start:start+blocksize]
+        # drop the block points dominated by the front found so far
+        dominated = np.any(np.all(front[None, :, :] <= block[:, None, :],
+                                  axis=2), axis=1)
+        # and those dominated by an earlier point of the block; dominance is
+        # transitive, so dominated earlier points need not be excluded
+        candidates = np.flatnonzero(~dominated)
+        pairs = np.all(block[candidates][None, :, :] <=
+                       block[candidates][:, None, :], axis=2)
+        earlier = np.tril(pairs, -1)
+        keep[start + candidates[~np.any(earlier, axis=1)]] = True
+
+    return order[keep]
+
+
+def _is_axial(props):
+    """Check for axial-mode flow properties.
+    """
+    return props is not None and props.mode == 'axial'
+
+
+def flow_batch(radii, pds, c, z, props):
+    """Build the batched flow object for a set of design points. Axial-mode
+    flow properties are always evaluated with the AxialFlowBatch march.
+    """
+    if _is_axial(props):
+        return AxialFlowBatch(radii, pds, c, z, props)
+
+    return FlowBatch(radii, pds, c, z, props)
+
+
+def flow_model(radius, PD, c, L, props=None):
+    """Build the flow object for a single design: a Flow for bulk-mode flow
+    properties and a single-point AxialFlowBatch for axial-mode ones. The
+    results of the latter are 0-d arrays.
+    """
+    if _is_axial(props):
+        return AxialFlowBatch(radius, PD, c, L, props)
+    if props is None:
+        props = FlowProperties()
+
+    return Flow(radius, PD, c, L, props)
+
+
+def sweep_chunk(radii, pds, z, c, props, batch, method, warm_start=False):
+    """Evaluate one chunk of sweep points. This is the unit of work handed to
+    the process pool by ParametricSweep and GridSweep.
+
+    Arguments:
+    ----------
+        radii: (ndarray) coolant channel radii of the chunk [m]
+        pds: (ndarray) pitch/diameter ratios of the chunk [-]
+        z: (float) core axial height [m]
+        c: (float) cladding thickness [m]
+        props: (FlowProperties) flow properties
+        batch: (bool) evaluate the chunk with FlowBatch
+        method: (str) N_channels solver, see find_n_channels
+        warm_start: (bool) start each scalar solve from the thermal solution
+        of the previous point in the chunk
+    Returns:
+    --------
+        rows: (ndarray) structured array of results for the chunk
+        n_evals: (int) N_channels evaluations used for the chunk
+    """
+    rows = np.zeros(len(radii), dtype=ParametricSweep.dtype)
+    rows['r'] = radii
+    rows['pd'] = pds
+
+    if batch or _is_axial(props):
+        flowdata = flow_batch(radii, pds, c, z, props)
+        n_evals = flowdata.solve(method)
+        flowdata.save_results(rows)
+        return rows, n_evals
+
+    n_evals = 0
+    guess = None
+    for idx, (r, pd) in enumerate(zip(radii, pds)):
+        flowdata = Flow(r, pd, c, z, props)
+        n_evals += oned_flow_modeling(flowdata, method, guess)
+        if warm_start:
+            guess = flowdata.N_thermal
+        flowdata.save_results(rows, idx)
+
+    return rows, n_evals
+
+
 class ParametricSweep():
     """Class to store results of parametric sweeps for 1D flow channel analysis.
 
     """
+    # one f8 column per saved Flow result plus the r, pd sweep coordinates
+    dtype = np.dtype({'names': list(Flow.savedata.keys()) + ['r', 'pd'],
+                      'formats': ['f8']*(len(Flow.savedata.keys()) + 2)})
+    # rows per block when scanning results
+    scan_size = 2**16
 
-    def __init__(self, N):
+    def __init__(self, N, path=None, resume=False, checkpoint_every=60):
         """Initialie ParametricSweep class.
 
         Initialized Attributes
         ----------------------
             N: (int) N^2 = number of grid points in the radius, PD mesh space.
+            path: (str) optional .npy file. If given, the results are streamed
+            to a memory-mapped array in this file instead of held in memory,
+            and the completed chunks are checkpointed to path + '.ckpt'.
+            resume: (bool) re-open the results in path and skip the chunks
+            recorded in its checkpoint.
+            checkpoint_every: (float) seconds between checkpoints
             data: (ndarray) structured array containing results of the
             parametric sweep.
         """
         self.N = N
-        # size of formats list
-        N_cats = len(Flow.savedata.keys()) + 2  # add 2 for r,pd
-        self.data = np.zeros(N*N, dtype={'names': list(Flow.savedata.keys()) +
-                                         ['r', 'pd'],
-                                         'formats': ['f8']*N_cats})
+        self.path = path
+        self.resume = resume and path is not None and os.path.exists(path)
+        self.checkpoint_every = checkpoint_every
+        self.completed = set()
+        if self.resume:
+            self.data = np.lib.format.open_memmap(path, mode='r+')
+            if self.data.dtype != self.dtype or len(self.data) != N*N:
+                raise ValueError("Sweep results in " + path + " do not " +
+                                 "match an N = " + str(N) + " sweep.")
+        elif path:
+            self.data = np.lib.format.open_memmap(path, mode='w+',
+                                                  dtype=self.dtype,
+                                                  shape=(N*N,))
+        else:
+            self.data = np.zeros(N*N, dtype=self.dtype)
 
-    def sweep_geometric_configs(self, radii, pds, z, c, props=None):
-        """Perform parametric sweep through pin cell geometric space. Calculate the
-        minimum required mass for TH purposes at each point.
+    @classmethod
+    def from_file(cls, path, mode='r'):
+        """Open the results of a sweep streamed to disk without loading them
+        into memory.
+
+        Returns:
+        --------
+            sweep: (ParametricSweep) sweep with memory-mapped data
+        """
+        sweep = cls.__new__(cls)
+        sweep.path = path
+        sweep.data = np.load(path, mmap_mode=mode)
+        sweep.N = int(round(math.sqrt(len(sweep.data))))
+
+        return sweep
+
+    def geometric_axes(self, radii, pds):
+        """Build the radius and PD axes of the N x N parameter mesh.
+
+        Arguments:
+        ----------
+            radii: (tuple) lower and upper coolant channel radius [m]
+            pds: (tuple) lower and upper pitch/diameter ratio [-]
+        Returns:
+        --------
+            R_array, PD_array: (ndarray) N radius and PD values
         """
         # calculate appropriate step sizes given range
         R_step = (radii[1] - radii[0]) / self.N
         PD_step = (pds[1] - pds[0]) / self.N
         # ranges for radius and pitch/diameter ratio
-        R_array = np.arange(radii[0], radii[1], R_step)
-        PD_array = np.arange(pds[0], pds[1], PD_step)
+        R_array = np.arange(radii[0], radii[1], R_step)[:self.N]
+        PD_array = np.arange(pds[0], pds[1], PD_step)[:self.N]
+
+        return R_array, PD_array
+
+    def geometric_mesh(self, radii, pds):
+        """Build the N x N (radius, PD) parameter mesh for a sweep.
+
+        Returns:
+        --------
+            R_mesh, PD_mesh: (ndarray) N x N parameter meshes
+        """
+        return np.meshgrid(*self.geometric_axes(radii, pds))
+
+    def chunk_points(self, R_array, PD_array, start, chunksize):
+        """Get the mesh points of one chunk of the flattened (i + j*N) sweep
+        layout without building the full mesh.
+
+        Returns:
+        --------
+            R, PD: (ndarray) radius and PD of the chunk's mesh points
+        """
+        idx = np.arange(start, min(start + chunksize, self.N*self.N))
+
+        return R_array[idx // self.N], PD_array[idx % self.N]
 
-        # create parameter mesh
-        R_mesh, PD_mesh = np.meshgrid(R_array, PD_array)
+    def iter_sweep(self, radii, pds, z, c, props=None, batch=False,
+                   method='newton', chunksize=None, skip=(), warm_start=False):
+        """Generate the sweep results chunk by chunk, in the save_iteration
+        layout (i + j*N). Only one chunk is held in memory at a time.
 
+        Arguments:
+        ----------
+            skip: (set) start indices of chunks that are not evaluated
+            warm_start: (bool) warm start every solve from the previous point
+            of its chunk (see sweep_chunk)
+        Yields:
+        -------
+            start: (int) index of the chunk's first row in data
+            rows: (ndarray) structured array of the chunk's results
+        """
+        R_array, PD_array = self.geometric_axes(radii, pds)
+        if not chunksize:
+            chunksize = self.N
+
+        self.solver_evals = 0
+        for start in range(0, self.N*self.N, chunksize):
+            if start in skip:
+                continue
+            R, PD = self.chunk_points(R_array, PD_array, start, chunksize)
+            rows, n_evals = sweep_chunk(R, PD, z, c, props, batch, method,
+                                        warm_start)
+            self.solver_evals += n_evals
+            yield start, rows
+
+    def sweep_geometric_configs(self, radii, pds, z, c, props=None,
+                                batch=False, method='newton', workers=1,
+                                chunksize=None, warm_start=False):
+        """Perform parametric sweep through pin cell geometric space. Calculate the
+        minimum required mass for TH purposes at each point.
+
+        Arguments:
+        ----------
+            batch: (bool) evaluate the whole mesh at once with FlowBatch
+            instead of one Flow object per mesh point. Axial-mode props are
+            always evaluated with AxialFlowBatch.
+            method: (str) N_channels solver, see find_n_channels.
+            workers: (int) number of worker processes. If > 1, the mesh is
+            split into chunks that are evaluated in a process pool.
+            chunksize: (int) mesh points per chunk (default N). The results
+            do not depend on the number of workers.
+            warm_start: (bool) continuation mode for scalar sweeps. The mesh
+            is traversed in serpentine order and every solve starts from the
+            thermal N_channels of the previous point (see find_n_channels).
+            Chunked sweeps restart at the first point of every chunk, so the
+            results still do not depend on the number of workers.
+
+        Modified Attributes:
+        --------------------
+            solver_evals: (int) total N_channels evaluations in the sweep
+            completed: (set) start indices of the completed chunks
+        """
+        if self.path:
+            signature = self.sweep_signature(radii, pds, z, c, props, batch,
+                                             method, chunksize, warm_start)
+            if self.resume:
+                self.load_checkpoint(signature)
+
+        if workers > 1 or self.path:
+            if workers > 1:
+                chunks = self.iter_parallel_sweep(radii, pds, z, c, props,
+                                                  batch, method, workers,
+                                                  chunksize, self.completed,
+                                                  warm_start)
+            else:
+                chunks = self.iter_sweep(radii, pds, z, c, props, batch,
+                                         method, chunksize, self.completed,
+                                         warm_start)
+            last_checkpoint = time.time()
+            for start, rows in chunks:
+                self.data[start:start+len(rows)] = rows
+                self.completed.add(start)
+                if self.path and \
+                        time.time() - last_checkpoint > self.checkpoint_every:
+                    self.save_checkpoint(signature)
+                    last_checkpoint = time.time()
+            if self.path:
+                self.save_checkpoint(signature)
+            return
+
+        R_mesh, PD_mesh = self.geometric_mesh(radii, pds)
+
+        if batch or _is_axial(props):
+            flowdata = flow_batch(R_mesh, PD_mesh, c, z, props)
+            self.solver_evals = flowdata.solve(method)
+            self.save_batch(flowdata)
+            return
+
+        self.solver_evals = 0
+        guess = None
         # sweep through parameter space, calculate min mass
         for i in range(self.N):
-            for j in range(self.N):
+            # serpentine order: every point is next to the previous one
+            cols = range(self.N) if not (warm_start and i % 2) else \
+                reversed(range(self.N))
+            for j in cols:
                 flowdata = Flow(R_mesh[i, j], PD_mesh[i, j], c, z, props)
-                oned_flow_modeling(flowdata)
+                self.solver_evals += oned_flow_modeling(flowdata, method,
+                                                        guess)
+                if warm_start:
+                    guess = flowdata.N_thermal
                 self.save_iteration(flowdata, i, j)
 
-        
+    def iter_parallel_sweep(self, radii, pds, z, c, props, batch, method,
+                            workers, chunksize=None, skip=(),
+                            warm_start=False):
+        """Evaluate the sweep mesh in a process pool. The mesh is flattened in
+        the save_iteration layout (i + j*N) and split into contiguous chunks;
+        the chunk results are generated in order, as in iter_sweep. At most
+        2*workers chunks are submitted but not yet generated.
+
+        Arguments:
+        ----------
+            workers: (int) number of worker processes
+            skip: (set) start indices of chunks that are not evaluated
+            warm_start: (bool) see iter_sweep
+        Yields:
+        -------
+            start: (int) index of the chunk's first row in data
+            rows: (ndarray) structured array of the chunk's results
+        """
+        R_array, PD_array = self.geometric_axes(radii, pds)
+        if not chunksize:
+            chunksize = self.N
+        starts = [s for s in range(0, self.N*self.N, chunksize)
+                  if s not in skip]
+
+        self.solver_evals = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # bounded window of in-flight chunks, so only about 2*workers
+            # chunk results are held in memory at a time
+            pending = iter(starts)
+            running = deque()
+            while True:
+                for s in itertools.islice(pending, 2*workers - len(running)):
+                    running.append((s, pool.submit(
+                        sweep_chunk,
+                        *self.chunk_points(R_array, PD_array, s, chunksize),
+                        z, c, props, batch, method, warm_start)))
+                if not running:
+                    break
+                # the future is dropped once its chunk is handed on
+                start, chunk = running.popleft()
+                rows, n_evals = chunk.result()
+                self.solver_evals += n_evals
+                yield start, rows
+
+    def sweep_signature(self, radii, pds, z, c, props, batch, method,
+                        chunksize, warm_start=False):
+        """Describe the sweep inputs. A checkpoint is only reused by a sweep
+        with the same signature.
+
+        Returns:
+        --------
+            signature: (dict) JSON-compatible sweep inputs
+        """
+        if props is None:
+            props = FlowProperties()
+        signature = {'N': self.N, 'radii': list(radii), 'pds': list(pds),
+                     'z': z, 'c': c, 'batch': batch, 'method': method,
+                     'chunksize': chunksize or self.N,
+                     'warm_start': warm_start,
+                     'props': {key: getattr(props, key) for key in
+                               ['m_dot', 'Q_therm', 'T', 'P', 'dp_limit',
+                                'mode', 'n_nodes']}}
+
+        return json.loads(json.dumps(signature))
+
+    def save_checkpoint(self, signature):
+        """Flush the results to disk and record the completed chunks in the
+        checkpoint file (path + '.ckpt'). The checkpoint is written to a
+        temporary file and moved into place, so it is never left partial.
+        """
+        self.data.flush()
+        checkpoint = self.path + '.ckpt'
+        with open(checkpoint + '.tmp', 'w') as ckptfile:
+            json.dump({'signature': signature,
+                       'completed': sorted(self.completed)}, ckptfile)
+        os.replace(checkpoint + '.tmp', checkpoint)
+
+    def load_checkpoint(self, signature):
+        """Load the completed chunks from the checkpoint file.
+
+        Modified Attributes:
+        --------------------
+            completed: (set) start indices of the completed chunks
+        """
+        checkpoint = self.path + '.ckpt'
+        if not os.path.exists(checkpoint):
+            return
+        with open(checkpoint) as ckptfile:
+            stored = json.load(ckptfile)
+        if stored['signature'] != signature:
+            raise ValueError("Checkpoint " + checkpoint + " was written by " +
+                             "a sweep with different inputs.")
+        self.completed = set(stored['completed'])
+
+    def save_batch(self, batch):
+        """ Save the data from a FlowBatch evaluated on the N x N sweep mesh.
+        Uses the same 2D -> 1D index (i + j*N) as save_iteration.
+        """
+        self.data['r'] = batch.r_channel.ravel(order='F')
+        self.data['pd'] = batch.pd_ratio.ravel(order='F')
+        for key in Flow.savedata.keys():
+            self.data[key] = np.broadcast_to(getattr(batch, key),
+                                             batch.r_channel.shape).ravel(order='F')
+
     def save_iteration(self, iteration, i, j):
         """ Save the data from each iteration of the parametric sweep. 
         """
         # 2D -> 1D index
         idx = i + j*self.N
         # store r, pd
-        self.data[idx]['r'] = iteration.r_channel
-        self.data[idx]['pd'] = iteration.pd_ratio
-        for key in Flow.savedata.keys():
-            self.data[idx][key] = iteration.__dict__[key]
+        self.data['r'][idx] = iteration.r_channel
+        self.data['pd'][idx] = iteration.pd_ratio
+        iteration.save_results(self.data, idx)
 
     def get_min_mass(self):
         """ After the parametric sweep is complete, find the minimum calculated
         fuel mass.
         """
-        # search the results for minimum-mass configuration
-        self.min_idx = list(self.data['mass']).index(min(self.data['mass']))
+        # search the results for minimum-mass configuration, one block at a
+        # time so streamed (memory-mapped) results are not loaded at once
+        self.min_idx = None
+        for start in range(0, len(self.data), self.scan_size):
+            mass = np.asarray(self.data['mass'][start:start+self.scan_size])
+            if np.all(np.isnan(mass)):
+                continue
+            idx = start + np.nanargmin(mass)
+            if self.min_idx is None or \
+                    self.data['mass'][idx] < self.data['mass'][self.min_idx]:
+                self.min_idx = idx
 
         # get data for min mass config
         self.min_mass = self.data[self.min_idx]['mass']
@@ -374,6 +1252,27 @@ class ParametricSweep():
         # return the min_idx to get other results at minimum config
         return self.min_idx
 
+    def get_pareto_front(self, objectives=('mass', 'dp')):
+        """Find the sweep points that are Pareto-optimal for the chosen
+        objectives (see pareto_front). Objectives are minimized; prefix a
+        name with '-' to maximize it instead, e.g. '-AR'.
+
+        Modified Attributes:
+        --------------------
+            pareto_idx: (ndarray) indices of the Pareto set in data
+        Returns:
+        --------
+            pareto_idx: (ndarray) indices of the Pareto set in data
+            front: (ndarray) structured array of the Pareto set
+        """
+        costs = np.stack([-np.asarray(self.data[key[1:]], dtype=float)
+                          if key.startswith('-') else
+                          np.asarray(self.data[key], dtype=float)
+                          for key in objectives], axis=-1)
+        self.pareto_idx = pareto_front(costs)
+
+        return self.pareto_idx, np.asarray(self.data[self.pareto_idx])
+
     def disp_min_mass(self):
         """ Display the minimum mass configuration.
         """
@@ -386,3 +1285,188 @@ class ParametricSweep():
             + "[kg]) " + " occurs at r = " + str(self.minD) + "[m] & PD = "\
             + str(self.minPD) + "[-]."
         print(outstring)
+
+
+class MassOptimization():
+    """Class to find the minimum-mass reactor design with a bounded continuous
+    optimizer instead of an exhaustive parametric sweep.
+
+    The objective is the fuel mass with N_channels raised to meet the dp_limit
+    constraint, and the optimal design is evaluated with oned_flow_modeling so
+    it satisfies dp_limit through Flow.adjust_dp. The designs are constrained
+    to thermal solutions that meet dp_limit, where the objective matches the
+    evaluated (unrounded) mass.
+    """
+
+    def __init__(self, method='SLSQP', solver='newton', n_start=5,
+                 dp_rtol=1e-6):
+        """Initialize MassOptimization class.
+
+        Initialized Attributes
+        ----------------------
+            method: (str) scipy.optimize.minimize method. Must support bounds
+            and inequality constraints.
+            solver: (str) N_channels solver, see find_n_channels.
+            n_start: (int) grid points per free variable used to pick the
+            starting point.
+            dp_rtol: (float) relative margin of the thermal design's dp below
+            dp_limit, see _dp_margin.
+        """
+        self.method = method
+        self.solver = solver
+        self.n_start = n_start
+        self.dp_rtol = dp_rtol
+
+    def _scale(self, x):
+        """Map normalized variables in [0, 1] to the design variable bounds.
+        """
+        return self.bounds[:, 0] + x * (self.bounds[:, 1] - self.bounds[:, 0])
+
+    def _coarse_start(self, fixed, props):
+        """Find the starting point as the lightest design on a coarse grid of
+        n_start points per free variable, evaluated with one FlowBatch.
+
+        Modified Attributes:
+        --------------------
+            nfev: (int) incremented by the number of grid designs
+        Returns:
+        --------
+            x0: (ndarray) normalized starting point
+        """
+        axes = [np.linspace(0, 1, self.n_start)]*len(self.free)
+        grid = np.array([g.ravel() for g in np.meshgrid(*axes)])
+        design = dict(fixed)
+        design.update(zip(self.free, self._scale(grid.T).T))
+        flowdata = flow_batch(design['r'], design['pd'], design['c'],
+                              design['z'], props)
+        flowdata.solve(self.solver)
+        self.nfev += grid.shape[1]
+
+        return grid[:, np.nanargmin(flowdata.mass)]
+
+    def _design(self, x, fixed, props):
+        """Solve the thermal N_channels of the design x (free variables) and
+        fixed (fixed variables), without the dp constraint. SLSQP evaluates
+        the objective and the constraint at the same points, so the last
+        design is reused.
+
+        Modified Attributes:
+        --------------------
+            nfev: (int) incremented for every solved design
+        Returns:
+        --------
+            flowdata: (Flow) design with N_channels and dp at N_channels
+        """
+        if self._last is not None and np.array_equal(self._last[0], x):
+            return self._last[1]
+        self.nfev += 1
+        design = dict(fixed)
+        design.update(zip(self.free, self._scale(x)))
+        flowdata = flow_model(design['r'], design['pd'], design['c'],
+                              design['z'], props)
+        find_n_channels(flowdata, self.solver)
+        flowdata.calc_dp()
+        self._last = (np.array(x), flowdata)
+
+        return flowdata
+
+    def _mass(self, x, fixed, props):
+        """Objective function: fuel mass of the design x (free variables) and
+        fixed (fixed variables).
+
+        adjust_dp rounds the dp-constrained N_channels up to an integer, which
+        makes the mass piecewise constant and stalls gradient-based methods.
+        The objective instead uses the continuous dp-constrained channel count;
+        since dp ~ f*v^2 ~ v^1.8 ~ N_channels^-1.8, it is
+        N_channels * (dp / dp_limit)^(1/1.8). Within the _dp_margin constraint
+        it is the thermal N_channels, which oned_flow_modeling does not round.
+        """
+        flowdata = self._design(x, fixed, props)
+        N_channels = flowdata.guess_channels *\
+            max(1, flowdata.dp / props.dp_limit)**(1 / 1.8)
+
+        return float(flowdata.A_fuel * flowdata.L * N_channels *
+                     const['rho_fuel'])
+
+    def _dp_margin(self, x, fixed, props):
+        """Inequality constraint (>= 0): the thermal solution of the design x
+        meets dp_limit with a relative margin of dp_rtol. Without it the
+        optimizer converges onto the dp_limit boundary from the dp-limited
+        side, where oned_flow_modeling rounds N_channels up.
+        """
+        flowdata = self._design(x, fixed, props)
+
+        return float(np.log(props.dp_limit / flowdata.dp)) -\
+            math.log1p(self.dp_rtol)
+
+    def optimize(self, radii, pds, z, c, props=None, x0=None):
+        """Minimize the fuel mass over the design variables. The core height z
+        and clad thickness c are optimized if they are given as (lower, upper)
+        bounds and held fixed if they are given as floats.
+
+        Arguments:
+        ----------
+            radii: (tuple) lower and upper coolant channel radius [m]
+            pds: (tuple) lower and upper pitch/diameter ratio [-]
+            z: (float or tuple) core axial height [m]
+            c: (float or tuple) cladding thickness [m]
+            props: (FlowProperties) flow properties
+            x0: (list) initial guess of the free variables (default: best
+            point of a coarse grid over the bounds)
+
+        Modified Attributes:
+        --------------------
+            opt: (dict) minimum-mass design variables
+            flow: (Flow) minimum-mass design
+            min_mass: (float) minimum fuel mass [kg]
+            nfev: (int) number of evaluated designs: the coarse start grid
+            (if x0 is not given), the objective calls and the final design
+            res: (OptimizeResult) scipy optimization result
+        Returns:
+        --------
+            opt: (dict) minimum-mass design variables
+        """
+        if props is None:
+            props = FlowProperties()
+        variables = {'r': radii, 'pd': pds, 'z': z, 'c': c}
+        self.free = [key for key in variables
+                     if isinstance(variables[key], (tuple, list))]
+        fixed = {key: variables[key] for key in variables
+                 if key not in self.free}
+        self.bounds = np.array([variables[key] for key in self.free])
+        self.nfev = 0
+        # optimize over variables normalized to [0, 1] within their bounds
+        if x0 is None:
+            x0 = self._coarse_start(fixed, props)
+        else:
+            x0 = (np.asarray(x0) - self.bounds[:, 0]) /\
+                (self.bounds[:, 1] - self.bounds[:, 0])
+
+        self._last = None
+        self.res = minimize(self._mass, x0, args=(fixed, props),
+                            method=self.method,
+                            bounds=[(0, 1)]*len(self.free),
+                            constraints={'type': 'ineq',
+                                         'fun': self._dp_margin,
+                                         'args': (fixed, props)})
+
+        self.opt = dict(fixed)
+        self.opt.update(zip(self.free, self._scale(self.res.x)))
+        self.flow = flow_model(self.opt['r'], self.opt['pd'], self.opt['c'],
+                               self.opt['z'], props)
+        oned_flow_modeling(self.flow, self.solver)
+        self.nfev += 1
+        self.min_mass = float(self.flow.mass)
+
+        return self.opt
+
+    def disp_min_mass(self):
+        """ Display the minimum mass configuration.
+        """
+        outstring = "1D Thermal Hydraulics Optimization Results:\n"
+        outstring += "Min reactor mass (m = " + str(round(self.min_mass, 3))\
+            + "[kg]) " + " occurs at r = " + str(self.opt['r']) + "[m] & PD = "\
+            + str(self.opt['pd']) + "[-] & z = " + str(self.opt['z']) +\
+            "[m] & c = " + str(self.opt['c']) + "[m].\n"
+        outstring += "Found in " + str(self.nfev) + " function evaluations."
+        print(outstring)
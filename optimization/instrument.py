@@ -0,0 +1,151 @@
+"""Hot-Path Instrumentation for the 1D Flow Model.
+This module contains an opt-in profiler that records call counts and wall
+time for every method of Flow and its subclasses (FlowBatch,
+AxialFlowBatch) and for the stages of
+oned_flow_modeling. The methods are only wrapped while the profiler is
+enabled, so there is no overhead otherwise.
+
+The following classes are contained in this module:
+    *Profiler
+"""
+import functools
+import inspect
+import time
+# Import TH functions
+import ht_functions
+from ht_functions import Flow
+
+
+class Profiler:
+    """Record call counts and inclusive wall time of the flow model.
+
+    Usage:
+        with Profiler() as prof:
+            sweep.sweep_geometric_configs(...)
+        print(prof.report())
+
+    Calls made in worker processes (ParametricSweep workers > 1) are not
+    recorded.
+    """
+    # module-level functions of ht_functions to instrument
+    functions = ['oned_flow_modeling', 'find_n_channels']
+
+    def __init__(self, classes=(Flow,)):
+        """Initialize the profiler.
+
+        Initialized Attributes:
+        -----------------------
+            classes: (tuple) classes whose methods are instrumented, together
+            with all of their subclasses
+            stats: (dict) name -> [calls, total wall time [s]]
+        """
+        self.classes = classes
+        self.stats = {}
+        self._originals = []
+
+    def _wrap(self, name, func):
+        """Wrap func so every call is counted and timed under name.
+        """
+        stats = self.stats
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entry = stats.setdefault(name, [0, 0.0])
+                entry[0] += 1
+                entry[1] += time.perf_counter() - start
+
+        return timed
+
+    def enable(self):
+        """Instrument the flow model. Methods are recorded under the name of
+        the class that defines them, e.g. 'Flow.calc_dp'.
+        """
+        for cls in self._walk_classes():
+            for attr, value in list(vars(cls).items()):
+                if inspect.isfunction(value):
+                    self._originals.append((cls, attr, value))
+                    setattr(cls, attr,
+                            self._wrap(cls.__name__ + '.' + attr, value))
+        for attr in self.functions:
+            value = getattr(ht_functions, attr)
+            self._originals.append((ht_functions, attr, value))
+            setattr(ht_functions, attr, self._wrap(attr, value))
+
+    def _walk_classes(self):
+        """List the instrumented classes and all of their subclasses, each
+        once, so overrides such as AxialFlowBatch's are timed as well.
+        """
+        found = []
+        pending = list(self.classes)
+        while pending:
+            cls = pending.pop(0)
+            if cls not in found:
+                found.append(cls)
+                pending.extend(cls.__subclasses__())
+
+        return found
+
+    def disable(self):
+        """Restore the original, uninstrumented flow model.
+        """
+        while self._originals:
+            owner, attr, value = self._originals.pop()
+            setattr(owner, attr, value)
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def reset(self):
+        """Clear the recorded statistics.
+        """
+        self.stats.clear()
+
+    def calls(self, name):
+        """Total calls of name, summed over the instrumented classes for
+        method names without a class prefix.
+        """
+        return sum(entry[0] for key, entry in self.stats.items()
+                   if key == name or key.endswith('.' + name))
+
+    def as_dict(self):
+        """Return the recorded statistics.
+
+        Returns:
+        --------
+            stats: (dict) name -> {'calls', 'time' [s], 'per_call' [s]}
+        """
+        return {name: {'calls': calls, 'time': seconds,
+                       'per_call': seconds / calls}
+                for name, (calls, seconds) in self.stats.items()}
+
+    def report(self):
+        """Format the recorded statistics, slowest first. Times are inclusive
+        of nested calls.
+
+        Returns:
+        --------
+            outstring: (str) profiling report
+        """
+        outstring = "1D Flow Model Profile (inclusive wall time):\n"
+        outstring += "{0:40s} {1:>10s} {2:>12s} {3:>12s}\n".format(
+            "name", "calls", "total [s]", "per call [us]")
+        for name, (calls, seconds) in sorted(self.stats.items(),
+                                             key=lambda item: -item[1][1]):
+            outstring += "{0:40s} {1:10d} {2:12.4e} {3:12.3f}\n".format(
+                name, calls, seconds, 1e6 * seconds / calls)
+        # compute_channels_from_guess runs once per solver evaluation and
+        # get_dp_constrained_Nchannels once per dp-limited design
+        outstring += "N_channels solver evaluations: " +\
+            str(self.calls('compute_channels_from_guess')) + "\n"
+        outstring += "dp-constrained projections: " +\
+            str(self.calls('get_dp_constrained_Nchannels'))
+
+        return outstring
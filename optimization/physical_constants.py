@@ -1,21 +1,44 @@
 """Physical Constants Used for 1D simulation
 *** All values are bulk flow values averaged axially across the core ***
 """
+import copy
 import math
 import numpy as np
 
+# fuel conductivity polynomial coefficients, highest order first
+fuel_cond_coeffs = [1.841e-19, -2.097e-15, 9.721e-12, -2.369e-8, 3.283e-5,
+                    -0.0267, 63.18]
+# coolant property fits: temperature limits and coefficients for the linear
+# fits f(T) = A*T + B
+coolant_fit = {'t_limit' : (900, 1200),
+               #                   k         mu         rho       Cp
+               'A' : np.array([7.0182e-5, 2.6652e-8, -0.080314, 0.255]),
+               'B' : np.array([0.0135,    1.32523e-5, 167.308,  977.66])
+              }
+
 def fuel_cond(T):
     """Estimate CERMET fuel conductivity based on T. Use a correlation from Webb
     and Charit "Analytical Determination of thermal conductivity of W-UO2 and
-    W-UN CERMET nuclear fuels. Correlation provided for 60% UN
+    W-UN CERMET nuclear fuels. Correlation provided for 60% UN. T may be a
+    float or a NumPy array.
     """
-
-    kc = 1.841e-19*math.pow(T, 6) - 2.097e-15*math.pow(T, 5) +\
-        9.721e-12*math.pow(T, 4) - 2.369e-8*math.pow(T, 3) +\
-        3.283e-5*math.pow(T, 2) - 0.0267*T + 63.18
+    kc = np.polyval(fuel_cond_coeffs, T)
 
     return kc
 
+def coolant_props(T):
+    """Evaluate the linear coolant property fits. T may be a float or a NumPy
+    array of any shape (or complex, for complex-step derivatives).
+
+    Returns:
+    --------
+        k_cool, mu, rho, Cp, Pr: coolant properties at T
+    """
+    k_cool, mu, rho, Cp = [A*T + B for A, B in zip(coolant_fit['A'],
+                                                   coolant_fit['B'])]
+
+    return k_cool, mu, rho, Cp, Cp * mu / k_cool
+
 ###############################################################################
 #                                                                             #
 #                            Literature Values                                #
@@ -31,16 +54,84 @@ const = {'T_center' : 1847.5, # centerline fuel temp (max) [K]
 const.update( {'rho_fuel' : const['fuel_frac'] * const['rho_UN'] +
                            (1 - const['fuel_frac'])*const['rho_W']} )
 # conservative estimate (@centerline T) for fuel thermal conductivity
-const.update( {'k_fuel' : fuel_cond(const['T_center'])} )
+const.update( {'k_fuel' : float(fuel_cond(const['T_center']))} )
+
+# default flow properties
+default_flow_inputs = {'m_dot' : 0.75, # coolant flow [kg/s]
+                       'Q_therm' : 131000, # core thermal power [W]
+                       'T' : 1031.45, # bulk coolant temp [K]
+                       'P' : 1.766e7, # bulk coolant pressure [Pa]
+                       'dp_limit' : 483500, # pressure drop limit [Pa]
+                      }
+
+class PropertyTable:
+    """Precomputed coolant property tables.
+    Coolant k, mu, rho, Cp and Pr are tabulated once on a temperature grid and
+    linearly interpolated, so properties at many axial nodes cost one
+    vectorized lookup instead of a fit evaluation per node.
+    """
+    keys = ['k_cool', 'mu', 'rho', 'Cp', 'Pr']
+
+    def __init__(self, t_min=800, t_max=2000, n_points=241):
+        """Tabulate the properties.
+
+        Initialized Attributes:
+        -----------------------
+            T: (ndarray) table temperatures [K]
+            values: (dict) tabulated properties on T
+        """
+        self.T = np.linspace(t_min, t_max, n_points)
+        self.values = dict(zip(self.keys, coolant_props(self.T)))
+
+    def lookup(self, T, keys=None):
+        """Interpolate the tabulated properties. As in
+        FlowProperties.secondary_properties, a single warning is printed if
+        any temperature is outside of the fit range, and the fits are
+        extrapolated there: temperatures outside of the table are evaluated
+        with the fits instead of clamped to the table ends.
+
+        Arguments:
+        ----------
+            T: (ndarray) temperatures [K]
+            keys: (list) properties to look up (default: all)
+        Returns:
+        --------
+            props: (dict) property arrays with the shape of T
+        """
+        T = np.asarray(T, dtype=float)
+        keys = keys or self.keys
+        if np.any(T < coolant_fit['t_limit'][0]) or \
+                np.any(T > coolant_fit['t_limit'][1]):
+            print("Warning T outside of fit range. Consider re-calculating your\
+ fit coeffs. to include this temperature!")
+
+        props = {key: np.interp(T, self.T, self.values[key]) for key in keys}
+        outside = (T < self.T[0]) | (T > self.T[-1])
+        if np.any(outside):
+            exact = dict(zip(self.keys, coolant_props(T)))
+            props = {key: np.where(outside, exact[key], props[key])
+                     for key in keys}
+
+        return props
+
+# shared precomputed property table
+property_table = PropertyTable()
 
 class FlowProperties:
     """Class to store flow properties and calculate secondary properties from
     fundamental props.
     """
 
-    def __init__(self, flow_inputs=None):
+    def __init__(self, flow_inputs=None, mode='bulk', n_nodes=20):
         """Inialize FlowProperties class and load required flow property data.
 
+        Arguments:
+        ----------
+            mode: (str) 'bulk' evaluates every property at the bulk coolant
+            temperature. 'axial' evaluates them along the channel from the
+            precomputed property_table, and the bulk properties become the
+            axial averages.
+            n_nodes: (int) number of axial nodes in 'axial' mode
         Modified Attributes:
         -----------------------
             m_dot: (float) mass flow rate [kg/s]
@@ -49,13 +140,7 @@ class FlowProperties:
             P: (float) bulk coolant pressure [Pa]
             dp_limit: (float) power-cycle constrained dp [Pa]
         """
-        # default flow properties
-        primary_properties = {'m_dot' : 0.75, # coolant flow [kg/s]
-                              'Q_therm' : 131000, # core thermal power [W]
-                              'T' : 1031.45, # bulk coolant temp [K]
-                              'P' : 1.766e7, # bulk coolant pressure [Pa]
-                              'dp_limit' : 483500, # pressure drop limit [Pa]
-                             }
+        primary_properties = default_flow_inputs
         # load optional custom flow properties
         if flow_inputs:
             primary_properties = flow_inputs
@@ -66,8 +151,14 @@ class FlowProperties:
         self.P = primary_properties['P']
         self.dp_limit = primary_properties['dp_limit']
 
+        self.mode = mode
+        self.n_nodes = n_nodes
+        self.k_fuel = const['k_fuel']
+
         # estimate secondary properties 
         self.secondary_properties()
+        if mode == 'axial':
+            self.axial_properties()
 
     def secondary_properties(self):
         """Calculate secondary properties from primary flow properties. Using
@@ -82,20 +173,118 @@ class FlowProperties:
             rho: (float) coolant density [kg/m^3]
             Pr: (float) cooland Prandtl number [-]
         """
-        # temperature limit for curve fits
-        fit = {'t_limit' : (900, 1200),
-               # coefficients for linear fit f(T) = A*T + b
-               #                   k         mu         rho       Cp
-               'A' : np.array([7.0182e-5, 2.6652e-8, -0.080314, 0.255]),
-               'B' : np.array([0.0135,    1.32523e-5, 167.308,  977.66])
-              }
+        fit = coolant_fit
         # if the input temperature is out of range of the fit, print a warning
         # message
         if self.T < fit['t_limit'][0] or self.T > fit['t_limit'][1]:
             print("Warning T outside of fit range. Consider re-calculating your\
  fit coeffs. to include this temperature!")
         
-        # evaluate linear fit
-        [self.k_cool, self.mu, self.rho, self.Cp] = fit['A']*self.T + fit['B']
-        # calculate Pr number
-        self.Pr = self.Cp * self.mu / self.k_cool
+        # evaluate linear fit, calculate Pr number
+        [self.k_cool, self.mu, self.rho, self.Cp, self.Pr] = \
+            coolant_props(self.T)
+
+    def axial_properties(self, table=property_table):
+        """Evaluate the properties along the channel. The coolant heats up
+        by dT_core = Q_therm / (m_dot Cp) following the chopped-cosine power
+        shape used in the flow model, so its axial average is the bulk
+        temperature. Fuel conductivity is kept at the conservative
+        centerline value (const['k_fuel']) at every node, as in bulk mode: the
+        limiting fuel temperature is the centerline temperature, and fuel_cond
+        is lowest there.
+
+        Modified Attributes:
+        --------------------
+            z_frac: (ndarray) axial node centers as fraction of core length
+            T_axial: (ndarray) coolant temperature at the nodes [K]
+            axial: (dict) property arrays at the nodes (see PropertyTable)
+            k_cool, mu, rho, Cp, Pr, k_fuel: (float) axial averages
+        """
+        dT_core = self.Q_therm / (self.m_dot * self.Cp)
+        self.z_frac = (np.arange(self.n_nodes) + 0.5) / self.n_nodes
+        # fraction of the power deposited upstream of each node
+        heated = (1 - np.cos(math.pi * self.z_frac)) / 2
+        self.T_axial = self.T + dT_core * (heated - 0.5)
+
+        self.axial = table.lookup(self.T_axial)
+        self.axial['k_fuel'] = np.full(self.n_nodes, const['k_fuel'])
+        [self.k_cool, self.mu, self.rho, self.Cp, self.Pr, self.k_fuel] = \
+            [np.mean(self.axial[key]) for key in PropertyTable.keys +
+             ['k_fuel']]
+
+    def perturbed(self, key, delta):
+        """Copy the flow properties with one primary property shifted by
+        delta. delta may be complex (complex-step derivatives); the secondary
+        properties are re-evaluated from the bulk fits without range checks.
+
+        Returns:
+        --------
+            props: (FlowProperties) perturbed copy
+        """
+        props = copy.copy(self)
+        setattr(props, key, getattr(self, key) + delta)
+        if key == 'T':
+            [props.k_cool, props.mu, props.rho, props.Cp, props.Pr] = \
+                coolant_props(props.T)
+
+        return props
+
+class FlowPropertiesBatch(FlowProperties):
+    """Class to store flow properties for arrays of operating points.
+
+    The primary properties are broadcast against each other and the secondary
+    properties of all points are calculated with one NumPy evaluation. The
+    container can be passed to FlowBatch in place of FlowProperties; its
+    arrays broadcast against the geometry arrays. Bulk mode only.
+    """
+
+    def __init__(self, flow_inputs=None):
+        """Initialize the batched flow properties. Missing primary properties
+        take the FlowProperties defaults.
+
+        Arguments:
+        ----------
+            flow_inputs: (dict) primary property -> float or array
+        Modified Attributes:
+        -----------------------
+            m_dot, Q_therm, T, P, dp_limit: (ndarray) primary properties
+            shape: (tuple) broadcast shape of the operating points
+            n_out_of_range: (int) points with T outside of the fit range
+        """
+        primary_properties = dict(default_flow_inputs)
+        primary_properties.update(flow_inputs or {})
+        names = ['m_dot', 'Q_therm', 'T', 'P', 'dp_limit']
+        arrays = np.broadcast_arrays(*[np.asarray(primary_properties[name],
+                                                  dtype=float)
+                                       for name in names])
+        for name, value in zip(names, arrays):
+            setattr(self, name, value)
+        self.shape = self.T.shape
+
+        self.mode = 'bulk'
+        self.n_nodes = None
+        self.k_fuel = const['k_fuel']
+
+        self.secondary_properties()
+
+    def secondary_properties(self):
+        """Calculate the secondary properties of every operating point. Points
+        outside of the fit range are reported in a single warning.
+
+        Modified Attributes:
+        --------------------
+            k_cool, mu, rho, Cp, Pr: (ndarray) coolant properties
+            n_out_of_range: (int) points with T outside of the fit range
+        """
+        fit = coolant_fit
+        out = (self.T < fit['t_limit'][0]) | (self.T > fit['t_limit'][1])
+        self.n_out_of_range = int(np.count_nonzero(out))
+        if self.n_out_of_range:
+            print("Warning T outside of fit range at " +
+                  str(self.n_out_of_range) + " of " + str(out.size) +
+                  " operating points (T = " + str(np.min(self.T)) + " to " +
+                  str(np.max(self.T)) + " K). Consider re-calculating your" +
+                  " fit coeffs. to include these temperatures!")
+
+        [self.k_cool, self.mu, self.rho, self.Cp, self.Pr] = \
+            coolant_props(self.T)
@@ -8,15 +8,20 @@ import numpy as np
 import math
 
 
-def plot(results, key, titles):
+def plot(results, key, titles, stride=1, pareto_idx=None):
     """Produce surface plot of the flow results as function of PD and coolant
     channel diameter.
+
+    Only every stride-th mesh point in each direction is read from the results,
+    so large sweeps streamed to disk can be plotted without loading them. If
+    pareto_idx (see ParametricSweep.get_pareto_front) is given, the Pareto set
+    is overlaid on the surface.
     """
     # get parametric sweep data
     N = int(math.sqrt(len(results.data)))
-    M = results.data[key].reshape(N, N)
-    R = results.data['r'].reshape(N, N)
-    PD = results.data['pd'].reshape(N, N)
+    M = np.asarray(results.data[key].reshape(N, N)[::stride, ::stride])
+    R = np.asarray(results.data['r'].reshape(N, N)[::stride, ::stride])
+    PD = np.asarray(results.data['pd'].reshape(N, N)[::stride, ::stride])
 
     fig = plt.figure()
     ax = fig.gca(projection='3d')
@@ -24,6 +29,11 @@ def plot(results, key, titles):
                            cmap=cm.viridis, linewidth=0,
                            vmin=0, vmax=np.nanmax(M),
                            antialiased=False)
+    if pareto_idx is not None and len(pareto_idx):
+        front = np.asarray(results.data[pareto_idx])
+        ax.scatter(front['r'], front['pd'], front[key], color='r', s=4,
+                   depthshade=False, label='Pareto set')
+        ax.legend(fontsize=6)
 
     # set x/y axis labels, ticks
     ax.set_xlabel("Coolant Channel Diameter [m]", fontsize=7)
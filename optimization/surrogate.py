@@ -0,0 +1,176 @@
+"""Tabulated Reactor Surrogate Model.
+The 1D flow model is used as a surrogate for the reactor inside an overall
+system mass calculation. This module precomputes the flow model results on a
+regular grid over geometry and flow conditions and interpolates them, so the
+outer optimizer gets fast lookups instead of full 1D solves.
+
+The following classes are contained in this module:
+    *SurrogateTable
+"""
+import itertools
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+# Import TH functions
+from physical_constants import FlowProperties
+from ht_functions import Flow, FlowBatch, oned_flow_modeling
+
+
+class SurrogateTable:
+    """Class to build, query and store a tabulated surrogate of the 1D flow
+    model.
+    """
+    # table axes: geometry (r, pd, L) then flow conditions
+    axis_names = ['r', 'pd', 'L', 'm_dot', 'Q_therm', 'T', 'dp_limit']
+    flow_names = ['m_dot', 'Q_therm', 'T', 'dp_limit']
+    # tabulated results
+    outputs = ['mass', 'N_channels', 'dp', 'AR']
+
+    def __init__(self, axes, c, P=1.766e7, method='linear', log=True):
+        """Initialize the surrogate table.
+
+        Initialized Attributes:
+        -----------------------
+            axes: (dict) strictly increasing grid points for every name in
+            axis_names
+            c: (float) cladding thickness [m]
+            P: (float) bulk coolant pressure [Pa]
+            method: (str) RegularGridInterpolator method ('linear' for
+            multilinear, 'cubic' for spline interpolation)
+            log: (bool) interpolate log(results) over log(axes). The results
+            are close to power laws of the inputs, so this is much more
+            accurate than interpolating the raw values.
+
+        The interpolation error is dominated by the r and L axes; a few
+        points per flow condition axis suffice (see test_surrogate).
+        """
+        self.axes = {name: np.asarray(axes[name], dtype=float)
+                     for name in self.axis_names}
+        self.c = c
+        self.P = P
+        self.method = method
+        self.log = log
+        self.values = {}
+        self.errors = {}
+
+    def props(self, m_dot, Q_therm, T, dp_limit):
+        """Build the FlowProperties for one flow condition.
+        """
+        return FlowProperties({'m_dot': m_dot, 'Q_therm': Q_therm, 'T': T,
+                               'P': self.P, 'dp_limit': dp_limit})
+
+    def build(self):
+        """Evaluate the flow model at every grid point. The (r, pd, L) grid of
+        each flow condition is evaluated with one FlowBatch.
+
+        Modified Attributes:
+        --------------------
+            values: (dict) N-D arrays of tabulated results
+        """
+        shape = tuple(len(self.axes[name]) for name in self.axis_names)
+        self.values = {key: np.zeros(shape) for key in self.outputs}
+        R, PD, L = np.meshgrid(self.axes['r'], self.axes['pd'],
+                               self.axes['L'], indexing='ij')
+
+        flow_axes = [enumerate(self.axes[name]) for name in self.flow_names]
+        for condition in itertools.product(*flow_axes):
+            idx, inputs = zip(*condition)
+            flowdata = FlowBatch(R, PD, self.c, L, self.props(*inputs))
+            flowdata.solve()
+            for key in self.outputs:
+                self.values[key][(Ellipsis,) + idx] = getattr(flowdata, key)
+
+        self._set_interpolators()
+
+    def _set_interpolators(self):
+        """Set up a single interpolator for all tabulated results.
+        """
+        grid = tuple(self.axes[name] for name in self.axis_names)
+        values = np.stack([self.values[key] for key in self.outputs], axis=-1)
+        if self.log:
+            grid = tuple(np.log(axis) for axis in grid)
+            values = np.log(values)
+        self.interpolator = RegularGridInterpolator(grid, values,
+                                                    method=self.method)
+
+    def lookup(self, r, pd, L, m_dot, Q_therm, T, dp_limit):
+        """Interpolate the tabulated results. Arguments may be floats or
+        arrays (broadcast against each other).
+
+        Returns:
+        --------
+            results: (dict) interpolated mass, N_channels, dp and AR; floats
+            for float arguments, arrays of the broadcast shape otherwise
+        """
+        inputs = np.broadcast_arrays(r, pd, L, m_dot, Q_therm, T, dp_limit)
+        points = np.stack(inputs, axis=-1).reshape(-1, len(inputs))
+        if self.log:
+            values = np.exp(self.interpolator(np.log(points)))
+        else:
+            values = self.interpolator(points)
+        values = values.reshape(inputs[0].shape + (len(self.outputs),))
+
+        # [()] turns the 0-d results of a float query into scalars
+        return {key: values[..., i][()] for i, key in enumerate(self.outputs)}
+
+    def error_bounds(self, n_samples=100, seed=0):
+        """Estimate the interpolation error against the exact 1D solver at
+        random points inside the table bounds.
+
+        Arguments:
+        ----------
+            n_samples: (int) number of random test points
+            seed: (int) random number generator seed
+        Modified Attributes:
+        --------------------
+            errors: (dict) max and mean relative error for every result
+        Returns:
+        --------
+            errors: (dict) max and mean relative error for every result
+        """
+        rng = np.random.RandomState(seed)
+        samples = {name: rng.uniform(self.axes[name][0], self.axes[name][-1],
+                                     n_samples) for name in self.axis_names}
+        obs = self.lookup(*[samples[name] for name in self.axis_names])
+
+        exp = {key: np.zeros(n_samples) for key in self.outputs}
+        for i in range(n_samples):
+            flowdata = Flow(samples['r'][i], samples['pd'][i], self.c,
+                            samples['L'][i],
+                            self.props(*[samples[name][i]
+                                         for name in self.flow_names]))
+            oned_flow_modeling(flowdata)
+            for key in self.outputs:
+                exp[key][i] = getattr(flowdata, key)
+
+        for key in self.outputs:
+            rel_err = np.abs(obs[key] - exp[key]) / np.abs(exp[key])
+            self.errors[key] = {'max': np.max(rel_err),
+                                'mean': np.mean(rel_err)}
+
+        return self.errors
+
+    def save(self, path):
+        """Write the table to a NumPy .npz file.
+        """
+        arrays = {'axis_' + name: self.axes[name] for name in self.axis_names}
+        arrays.update({'value_' + key: self.values[key]
+                       for key in self.outputs})
+        np.savez(path, c=self.c, P=self.P, method=self.method, log=self.log,
+                 **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load a table written by save.
+
+        Returns:
+        --------
+            table: (SurrogateTable) table ready for lookups
+        """
+        stored = np.load(path)
+        table = cls({name: stored['axis_' + name] for name in cls.axis_names},
+                    float(stored['c']), float(stored['P']),
+                    str(stored['method']), bool(stored['log']))
+        table.values = {key: stored['value_' + key] for key in cls.outputs}
+        table._set_interpolators()
+
+        return table
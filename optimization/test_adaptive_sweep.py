@@ -0,0 +1,39 @@
+import numpy as np
+from adaptive_sweep import AdaptiveSweep
+from ht_functions import FlowBatch, AxialFlowBatch
+from physical_constants import FlowProperties
+
+radii = (0.001, 0.02)
+pds = (1.05, 3.0)
+c = 0.00031
+L = 0.3
+
+def test_adaptive_min_mass():
+    """Test that the adaptive sweep finds the same minimum as a uniform sweep
+    at the finest resolution, while evaluating far fewer points.
+    """
+    props = FlowProperties()
+    obs = AdaptiveSweep(coarse=5, levels=4)
+    obs.sweep_geometric_configs(radii, pds, L, c, props)
+    obs.get_min_mass()
+    # uniform sweep on the finest lattice
+    M = obs.M
+    R, PD = np.meshgrid(radii[0] + np.arange(M + 1) * (radii[1] - radii[0]) / M,
+                        pds[0] + np.arange(M + 1) * (pds[1] - pds[0]) / M)
+    exp = FlowBatch(R, PD, c, L, props)
+    exp.solve()
+
+    assert obs.min_mass == np.nanmin(exp.mass)
+    assert len(obs.data) < (M + 1)**2 / 2
+
+def test_adaptive_axial():
+    """Test that the adaptive sweep solves axial-mode properties with the
+    axial model.
+    """
+    props = FlowProperties(mode='axial', n_nodes=10)
+    obs = AdaptiveSweep(coarse=3, levels=1)
+    obs.sweep_geometric_configs(radii, pds, L, c, props)
+    exp = AxialFlowBatch(obs.data['r'], obs.data['pd'], c, L, props)
+    exp.solve()
+
+    assert np.allclose(obs.data['mass'], exp.mass, rtol=1e-12, equal_nan=True)
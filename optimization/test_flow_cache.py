@@ -0,0 +1,42 @@
+from flow_cache import FlowCache
+from ht_functions import Flow, oned_flow_modeling
+from physical_constants import FlowProperties
+
+# parameters for test cases
+radius = 0.005
+PD = 2
+c = 0.00031
+L = 0.5
+
+def test_cache_hits():
+    """Test that repeated and near-identical inputs are served from the cache
+    and match a direct calculation.
+    """
+    props = FlowProperties()
+    cache = FlowCache(rtol=1e-6)
+    obs = cache.evaluate(radius, PD, c, L, props)
+    cache.evaluate(radius, PD, c, L, props)
+    cache.evaluate(radius * (1 + 1e-9), PD, c, L, props)
+    cache.evaluate(radius * 1.01, PD, c, L, props)
+
+    exp = Flow(radius, PD, c, L, props)
+    oned_flow_modeling(exp)
+
+    assert (cache.hits, cache.misses) == (2, 2)
+    for key in Flow.savedata:
+        assert obs[key] == getattr(exp, key)
+
+def test_cache_lru_persist(tmp_path):
+    """Test LRU eviction and saving/loading the cache from disk.
+    """
+    path = str(tmp_path / 'flow_cache.pkl')
+    cache = FlowCache(maxsize=2, path=path)
+    for r in (0.004, 0.005, 0.006):
+        cache.evaluate(r, PD, c, L)
+    assert len(cache.results) == 2
+    cache.save()
+
+    warm = FlowCache(maxsize=2, path=path)
+    warm.evaluate(0.006, PD, c, L)
+    warm.evaluate(0.004, PD, c, L)
+    assert (warm.hits, warm.misses) == (1, 1)
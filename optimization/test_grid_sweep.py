@@ -0,0 +1,62 @@
+import numpy as np
+from grid_sweep import GridSweep
+from ht_functions import FlowBatch, AxialFlowBatch
+from physical_constants import FlowProperties
+
+radii = np.linspace(0.002, 0.01, 6)
+pds = np.linspace(1.1, 2.5, 5)
+lengths = [0.3, 0.5]
+m_dots = [0.5, 0.75, 1.0]
+c = 0.00031
+
+def test_grid_sweep():
+    """Test the N-D sweep against FlowBatch for one flow condition, serial
+    against parallel evaluation and the per-axis min mass reduction.
+    """
+    obs = GridSweep(r=radii, pd=pds, L=lengths, c=c, m_dot=m_dots)
+    obs.sweep()
+    
+    assert obs.dims == ['r', 'pd', 'L', 'm_dot']
+    assert obs.data.shape == (6, 5, 2, 3)
+    
+    props = FlowProperties({'m_dot' : 1.0, 'Q_therm' : 131000, 'T' : 1031.45,
+                            'P' : 1.766e7, 'dp_limit' : 483500})
+    exp = FlowBatch(radii[:, None], pds[None, :], c, 0.5, props)
+    exp.solve()
+    assert np.array_equal(obs.data['mass'][:, :, 1, 2], exp.mass)
+    
+    parallel = GridSweep(r=radii, pd=pds, L=lengths, c=c, m_dot=m_dots)
+    parallel.sweep(workers=2, chunksize=7)
+    assert np.array_equal(obs.data, parallel.data)
+    
+    best = obs.min_mass(keep=('m_dot', 'L'))
+    assert best['mass'].shape == (3, 2)
+    for i in range(3):
+        for j in range(2):
+            mass = obs.data['mass'][:, :, j, i]
+            assert best['mass'][i, j] == np.nanmin(mass)
+            assert obs.data['mass'][tuple(idx[i, j] for idx in best['index'])]\
+                == best['mass'][i, j]
+    assert obs.min_mass()['mass'] == np.nanmin(obs.data['mass'])
+
+def test_grid_sweep_chunks():
+    """Test the lazily built chunks against the full mesh and the axial-mode
+    sweep against AxialFlowBatch with chunks that split the geometry grid.
+    """
+    obs = GridSweep(r=radii, pd=pds, L=lengths, c=c, m_dot=m_dots)
+    mesh = np.meshgrid(*[obs.values[name] for name in obs.axis_names],
+                       indexing='ij')
+    points = obs.chunk_points(obs.axis_names, 7, 20)
+    for x, exp in zip(points, mesh):
+        assert np.array_equal(x, exp.ravel()[7:20])
+
+    axial = GridSweep('axial', 10, r=radii[:3], pd=pds[:3], L=0.5, c=c,
+                      m_dot=m_dots[1:])
+    axial.sweep(chunksize=4)
+    for i, m_dot in enumerate(m_dots[1:]):
+        props = FlowProperties({'m_dot' : m_dot, 'Q_therm' : 131000,
+                                'T' : 1031.45, 'P' : 1.766e7,
+                                'dp_limit' : 483500}, 'axial', 10)
+        exp = AxialFlowBatch(radii[:3, None], pds[None, :3], c, 0.5, props)
+        exp.solve()
+        assert np.array_equal(axial.data['mass'][:, :, i], exp.mass)
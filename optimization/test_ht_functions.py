@@ -1,7 +1,11 @@
 import math
 import pytest
 from random import uniform
-from ht_functions import Flow, oned_flow_modeling
+import numpy as np
+from ht_functions import Flow, FlowBatch, AxialFlowBatch, ParametricSweep,\
+    oned_flow_modeling, find_n_channels, MassOptimization, pareto_front
+from physical_constants import FlowProperties
+from flow_cache import FlowCache
 
 # parameters for test cases
 radius = 0.005
@@ -15,7 +19,7 @@ def test_set_geom():
     flow area, fuel area and hydraulic diameter.
     """
     test = Flow(radius, PD, c, L)
-    test.guess = N
+    test.guess_channels = N
     # expected values
     exp_De = radius * 2.0
     exp_A_flow = math.pi * radius**2
@@ -84,6 +88,30 @@ def test_dp():
     # compare
     assert (exp_dp - test.dp)**2 < 1e-5
 
+def test_dp_projection():
+    """Test that the projected dp-constrained N_channels is the smallest
+    integer channel count that meets the dp limit, for Flow and FlowBatch.
+    """
+    props = FlowProperties()
+    props.dp_limit = 1e5
+    R, P = np.meshgrid(np.linspace(0.001, 0.01, 10), np.linspace(1.05, 2.5, 10))
+    obs = FlowBatch(R, P, c, L, props)
+    obs.solve()
+    limited = obs.dp_limited
+    assert np.any(limited)
+    assert np.all(obs.dp[limited] <= props.dp_limit)
+    # one channel fewer violates the constraint
+    fewer = FlowBatch(R, P, c, L, props)
+    fewer.guess_channels = obs.N_channels - 1
+    fewer.characterize_flow()
+    fewer.calc_dp()
+    assert np.all(fewer.dp[limited] > props.dp_limit)
+
+    for idx in zip(*np.nonzero(limited)):
+        exp = Flow(R[idx], P[idx], c, L, props)
+        oned_flow_modeling(exp)
+        assert exp.N_channels == obs.N_channels[idx]
+
 def test_flow_calc():
     """Test the oned_flow_modeling function against the google drive
     spreadsheet.
@@ -116,3 +144,301 @@ def test_rand_flow_calc():
     exp.get_q_per_channel()
     
     assert abs(exp.q_per_channel - obs.q_per_channel) < 1.0
+
+def test_save_results():
+    """Test that Flow keeps its state in slots and that Flow and FlowBatch
+    results are copied into preallocated columns.
+    """
+    obs = Flow(radius, PD, c, L)
+    oned_flow_modeling(obs)
+    assert not hasattr(obs, '__dict__')
+    with pytest.raises(AttributeError):
+        obs.N_guess = N
+
+    columns = np.zeros(3, dtype=ParametricSweep.dtype)
+    obs.save_results(columns, 1)
+    batch = FlowBatch(np.full(2, radius), np.full(2, PD), c, L)
+    batch.solve()
+    batch.save_results(columns, slice(1, 3))
+    for key in Flow.savedata.keys():
+        assert columns[key][0] == 0
+        assert columns[key][1] == pytest.approx(getattr(obs, key), rel=1e-9)
+        assert columns[key][2] == columns[key][1]
+
+def test_flow_batch():
+    """Test the vectorized FlowBatch sweep against the scalar Flow sweep.
+    """
+    props = FlowProperties()
+    obs = ParametricSweep(N)
+    obs.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props,
+                                batch=True)
+    exp = ParametricSweep(N)
+    exp.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props)
+
+    assert np.array_equal(exp.data['r'], obs.data['r'])
+    assert np.array_equal(exp.data['pd'], obs.data['pd'])
+    for key in Flow.savedata.keys():
+        assert np.allclose(exp.data[key], obs.data[key], rtol=1e-3)
+
+def test_n_channels_solvers():
+    """Test that the Newton and fixed-point N_channels solvers converge to the
+    legacy bounded minimization result with fewer evaluations.
+    """
+    exp = Flow(radius, PD, c, L)
+    exp_evals = find_n_channels(exp, 'bounded')
+    for method in ('newton', 'fixed-point'):
+        obs = Flow(radius, PD, c, L)
+        obs_evals = find_n_channels(obs, method)
+        assert obs.N_channels == pytest.approx(exp.N_channels, rel=1e-3)
+        assert obs.guess_channels == pytest.approx(obs.N_channels, rel=1e-9)
+        assert 2 * obs_evals < exp_evals
+    # newton should be an order of magnitude cheaper than the legacy solver
+    newton_evals = find_n_channels(Flow(radius, PD, c, L), 'newton')
+    assert 5 * newton_evals < exp_evals
+
+    with pytest.raises(ValueError):
+        find_n_channels(Flow(radius, PD, c, L), 'secant')
+
+def test_parallel_sweep():
+    """Test that the process-pool sweep reproduces the serial sweep exactly.
+    """
+    props = FlowProperties()
+    exp = ParametricSweep(N)
+    exp.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props)
+    obs = ParametricSweep(N)
+    obs.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props,
+                                workers=2, chunksize=5)
+
+    assert np.array_equal(exp.data, obs.data)
+    assert exp.solver_evals == obs.solver_evals
+
+def test_warm_start_sweep():
+    """Test that a warm-started (continuation) sweep reproduces the cold
+    sweep with fewer solver evaluations, both in memory and in chunks.
+    """
+    props = FlowProperties()
+    for method, rtol in (('newton', 1e-8), ('bounded', 1e-3)):
+        exp = ParametricSweep(N)
+        exp.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props,
+                                    method=method)
+        obs = ParametricSweep(N)
+        obs.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props,
+                                    method=method, warm_start=True)
+        for key in Flow.savedata.keys():
+            assert np.allclose(exp.data[key], obs.data[key], rtol=rtol)
+        assert obs.solver_evals < exp.solver_evals
+    # the legacy solver profits most from the narrowed bracket
+    assert 2 * obs.solver_evals < exp.solver_evals
+
+    exp = ParametricSweep(N)
+    exp.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props,
+                                workers=2, chunksize=5, warm_start=True)
+    obs = ParametricSweep(N)
+    obs.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props,
+                                workers=3, chunksize=5, warm_start=True)
+    assert np.array_equal(exp.data, obs.data)
+    assert exp.solver_evals == obs.solver_evals
+
+def test_mass_optimization():
+    """Test that the continuous optimizer finds a design at least as light as
+    the best point of a parametric sweep over the same bounds, and that it
+    satisfies the dp constraint.
+    """
+    props = FlowProperties()
+    sweep = ParametricSweep(20)
+    sweep.sweep_geometric_configs((0.001, 0.02), (1.05, 3.0), L, c, props,
+                                  batch=True)
+    sweep.get_min_mass()
+
+    obs = MassOptimization()
+    obs.optimize((0.001, 0.02), (1.05, 3.0), L, c, props)
+
+    assert obs.min_mass <= sweep.min_mass
+    assert obs.flow.dp <= props.dp_limit
+    assert obs.opt['z'] == L
+    # the count includes the coarse start grid and the final design
+    assert obs.n_start**2 + 1 < obs.nfev < 20*20
+
+def test_mass_optimization_dp_boundary():
+    """Test that an optimum on the dp_limit boundary is not rounded up to the
+    next integer N_channels, so it is no heavier than the best point of a
+    fine sweep.
+    """
+    props = FlowProperties()
+    R, P = np.meshgrid(np.linspace(0.002, 0.01, 401),
+                       np.linspace(1.1, 2.5, 41))
+    sweep = FlowBatch(R, P, c, L, props)
+    sweep.solve()
+
+    obs = MassOptimization()
+    obs.optimize((0.002, 0.01), (1.1, 2.5), L, c, props)
+
+    assert obs.min_mass <= np.nanmin(sweep.mass)
+    assert not obs.flow.dp_limited
+
+def test_streamed_sweep(tmp_path):
+    """Test that a sweep streamed to disk matches the in-memory sweep and can
+    be re-opened for analysis.
+    """
+    props = FlowProperties()
+    path = str(tmp_path / 'sweep.npy')
+    exp = ParametricSweep(N)
+    exp.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props,
+                                batch=True)
+    obs = ParametricSweep(N, path)
+    obs.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props,
+                                batch=True, chunksize=7)
+    loaded = ParametricSweep.from_file(path)
+
+    assert np.array_equal(exp.data, loaded.data)
+    assert loaded.N == N
+    assert exp.get_min_mass() == loaded.get_min_mass()
+
+    # more chunks than the in-flight window of the process pool
+    path = str(tmp_path / 'parallel.npy')
+    obs = ParametricSweep(N, path)
+    obs.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props,
+                                batch=True, workers=2, chunksize=3)
+    assert np.array_equal(exp.data, ParametricSweep.from_file(path).data)
+
+def test_resume_sweep(tmp_path):
+    """Test that a resumed sweep only evaluates the chunks missing from the
+    checkpoint and that a checkpoint from different inputs is rejected.
+    """
+    props = FlowProperties()
+    path = str(tmp_path / 'sweep.npy')
+    exp = ParametricSweep(N, path)
+    exp.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props)
+    exp_data = np.array(exp.data)
+    # simulate a sweep killed after the first two chunks
+    exp.data[2*N:] = 0
+    exp.completed = {0, N}
+    exp.save_checkpoint(exp.sweep_signature((0.005, 0.01), (1.1, 2), L, c,
+                                            props, False, 'newton', None))
+
+    obs = ParametricSweep(N, path, resume=True)
+    obs.sweep_geometric_configs((0.005, 0.01), (1.1, 2), L, c, props)
+    assert np.array_equal(exp_data, obs.data)
+    assert obs.completed == set(range(0, N*N, N))
+
+    stale = ParametricSweep(N, path, resume=True)
+    with pytest.raises(ValueError):
+        stale.sweep_geometric_configs((0.005, 0.01), (1.1, 2), 2*L, c, props)
+
+def test_axial_flow_batch():
+    """Test the axially discretized model. With a negligible coolant
+    temperature rise it must reduce to the bulk model, and a batch must give
+    the same results as its points solved one at a time.
+    """
+    inputs = {'m_dot' : 75, 'Q_therm' : 131000, 'T' : 1031.45, 'P' : 1.766e7,
+              'dp_limit' : 4.835e9}
+    obs = AxialFlowBatch(radius, PD, c, L, FlowProperties(inputs, 'axial', 200))
+    obs.solve()
+    exp = FlowBatch(radius, PD, c, L, FlowProperties(inputs))
+    exp.solve()
+    
+    assert obs.N_channels == pytest.approx(exp.N_channels, rel=1e-3)
+    assert obs.dp == pytest.approx(exp.dp, rel=1e-3)
+    
+    radii = np.linspace(0.003, 0.008, 4)
+    batch = AxialFlowBatch(radii, PD, c, L, n_nodes=10)
+    batch.solve()
+    for i, r in enumerate(radii):
+        single = AxialFlowBatch(r, PD, c, L, n_nodes=10)
+        single.solve()
+        assert batch.mass[i] == pytest.approx(single.mass, rel=1e-9)
+        assert batch.dp[i] <= FlowProperties().dp_limit
+
+def test_axial_consumers():
+    """Test that the bulk Flow rejects axial-mode properties and that the
+    single-design consumers solve the axial model with them.
+    """
+    props = FlowProperties(mode='axial', n_nodes=10)
+    with pytest.raises(ValueError):
+        Flow(radius, PD, c, L, props)
+    with pytest.raises(ValueError):
+        FlowBatch(radius, PD, c, L, props)
+
+    obs = MassOptimization()
+    obs.optimize((0.003, 0.008), (1.2, 2.5), L, c, props)
+    exp = AxialFlowBatch(obs.opt['r'], obs.opt['pd'], c, L, props)
+    exp.solve()
+    assert obs.min_mass == pytest.approx(float(exp.mass), rel=1e-12)
+
+    cache = FlowCache()
+    results = cache.evaluate(radius, PD, c, L, props)
+    exp = AxialFlowBatch(radius, PD, c, L, props)
+    exp.solve()
+    for key in Flow.savedata.keys():
+        assert results[key] == pytest.approx(float(getattr(exp, key)),
+                                             rel=1e-12)
+
+def test_pareto_front():
+    """Test the sorting-based Pareto front against a pairwise dominance check
+    for two and three objectives, and on sweep results.
+    """
+    rng = np.random.RandomState(0)
+    for n_obj in (2, 3):
+        costs = np.round(rng.rand(300, n_obj), 1)
+        exp = []
+        for i in range(len(costs)):
+            dominated = np.all(costs <= costs[i], axis=1)
+            # identical points: only the first is kept
+            dominated[i:] &= ~np.all(costs[i:] == costs[i], axis=1)
+            if not np.any(dominated):
+                exp.append(i)
+        assert sorted(pareto_front(costs, blocksize=16)) == exp
+    
+    sweep = ParametricSweep(N)
+    sweep.sweep_geometric_configs((0.002, 0.01), (1.1, 2.5), L, c, batch=True)
+    idx, front = sweep.get_pareto_front(('mass', 'dp'))
+    sweep.get_min_mass()
+    
+    assert idx[0] == sweep.min_idx
+    assert np.all(np.diff(front['mass']) > 0)
+    assert np.all(np.diff(front['dp']) < 0)
+
+def test_sensitivities():
+    """Test the complex-step/implicit sensitivities against central finite
+    differences of full solves, for a design below the dp limit and the
+    continuous N_channels of a dp-limited design.
+    """
+    inputs = {'m_dot' : 0.75, 'Q_therm' : 131000, 'T' : 1031.45,
+              'P' : 1.766e7, 'dp_limit' : 483500}
+    geom = {'r' : np.array([radius, 0.002]), 'PD' : np.array([PD, 1.1]),
+            'L' : L, 'c' : c}
+
+    def solve(geom, inputs):
+        flowdata = FlowBatch(geom['r'], geom['PD'], geom['c'], geom['L'],
+                             FlowProperties(inputs))
+        flowdata.solve()
+        # continuous dp-limited N_channels
+        scale = np.where(flowdata.dp_limited,
+                         flowdata.dp / inputs['dp_limit'], 1)
+        return {'N_channels' : flowdata.N_channels * scale**(1/1.8),
+                'mass' : flowdata.mass, 'dp' : flowdata.dp,
+                'AR' : flowdata.AR}
+
+    flowdata = FlowBatch(geom['r'], geom['PD'], c, L, FlowProperties(inputs))
+    flowdata.solve()
+    sens = flowdata.sensitivities()
+    assert list(flowdata.dp_limited) == [False, True]
+    
+    for name in FlowBatch.sens_inputs:
+        values = geom if name in geom else inputs
+        x = values[name]
+        step = 1e-6 * np.abs(x)
+        values[name] = x + step
+        up = solve(geom, inputs)
+        values[name] = x - step
+        down = solve(geom, inputs)
+        values[name] = x
+        fd = {key: (up[key] - down[key]) / (2*step) for key in up}
+        
+        for key in FlowBatch.sens_outputs:
+            assert sens[key][name][0] == pytest.approx(fd[key][0], rel=1e-5,
+                                                       abs=1e-12)
+        assert sens['N_channels'][name][1] ==\
+            pytest.approx(fd['N_channels'][1], rel=1e-5, abs=1e-12)
+        assert sens['dp'][name][1] ==\
+            pytest.approx(1 if name == 'dp_limit' else 0, abs=1e-9)
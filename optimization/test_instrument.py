@@ -0,0 +1,36 @@
+from instrument import Profiler
+from ht_functions import Flow, ParametricSweep
+from physical_constants import FlowProperties
+
+N = 5
+c = 0.00031
+L = 0.3
+
+def test_profiler_counts():
+    """Test that the profiler counts every stage of a sweep and restores the
+    original methods when disabled.
+    """
+    original = Flow.characterize_flow
+    sweep = ParametricSweep(N)
+    with Profiler() as prof:
+        sweep.sweep_geometric_configs((0.002, 0.01), (1.1, 2.5), L, c,
+                                      FlowProperties())
+
+    assert Flow.characterize_flow is original
+    assert prof.stats['Flow.__init__'][0] == N*N
+    assert prof.stats['oned_flow_modeling'][0] == N*N
+    assert prof.stats['Flow.adjust_dp'][0] == N*N
+    assert prof.calls('compute_channels_from_guess') == sweep.solver_evals
+    assert 'dp-constrained projections' in prof.report()
+
+def test_profiler_subclasses():
+    """Test that the overrides of Flow subclasses are instrumented, e.g. the
+    axial model's.
+    """
+    sweep = ParametricSweep(N)
+    with Profiler() as prof:
+        sweep.sweep_geometric_configs((0.002, 0.01), (1.1, 2.5), L, c,
+                                      FlowProperties(mode='axial', n_nodes=5))
+
+    assert prof.stats['AxialFlowBatch.characterize_flow'][0] > 0
+    assert prof.stats['FlowBatch.adjust_dp'][0] == 1
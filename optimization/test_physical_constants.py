@@ -0,0 +1,111 @@
+import math
+import numpy as np
+from pytest import approx
+from physical_constants import FlowProperties, FlowPropertiesBatch,\
+    PropertyTable, fuel_cond, const, default_flow_inputs
+from ht_functions import FlowBatch, AxialFlowBatch, ParametricSweep
+
+def test_property_table(capsys):
+    """Test the interpolated properties against the fits they tabulate, also
+    outside of the fit range and of the table, where both warn.
+    """
+    table = PropertyTable()
+    assert 'k_fuel' not in table.values
+    for T in (np.linspace(950, 1150, 7), np.array([700, 1000, 2100])):
+        obs = table.lookup(T)
+        assert capsys.readouterr().out.count('Warning') == int(T[0] < 900)
+        for i, temp in enumerate(T):
+            exp = FlowProperties({'m_dot' : 0.75, 'Q_therm' : 131000,
+                                  'T' : temp, 'P' : 1.766e7,
+                                  'dp_limit' : 483500})
+            for key in table.keys:
+                assert obs[key][i] == approx(getattr(exp, key), rel=1e-5)
+
+def test_fuel_cond():
+    """Test the vectorized fuel conductivity polynomial.
+    """
+    T = 1500
+    exp = 1.841e-19*math.pow(T, 6) - 2.097e-15*math.pow(T, 5) +\
+        9.721e-12*math.pow(T, 4) - 2.369e-8*math.pow(T, 3) +\
+        3.283e-5*math.pow(T, 2) - 0.0267*T + 63.18
+    
+    assert fuel_cond(T) == approx(exp, rel=1e-12)
+    assert fuel_cond(np.array([T, T]))[1] == approx(exp, rel=1e-12)
+
+def test_axial_properties():
+    """Test that the axial coolant temperature rise matches the energy
+    balance and averages to the bulk temperature, that the bulk model is
+    unchanged, and that axial-mode sweeps solve the axial model, which
+    reduces to the bulk model for a negligible temperature rise.
+    """
+    bulk = FlowProperties()
+    axial = FlowProperties(mode='axial', n_nodes=40)
+    
+    assert bulk.k_fuel == const['k_fuel']
+    assert np.mean(axial.T_axial) == approx(bulk.T)
+    assert np.all(np.diff(axial.T_axial) > 0)
+    # end nodes sit half a node inside the channel
+    dT_core = bulk.Q_therm / (bulk.m_dot * bulk.Cp)
+    assert axial.T_axial[-1] - axial.T_axial[0] ==\
+        approx(dT_core * math.cos(math.pi / 80))
+    assert axial.rho == approx(bulk.rho, rel=1e-3)
+    # conservative centerline fuel conductivity at every node
+    assert np.all(axial.axial['k_fuel'] == const['k_fuel'])
+    assert axial.k_fuel == const['k_fuel']
+    
+    sweep = ParametricSweep(3)
+    sweep.sweep_geometric_configs((0.004, 0.006), (1.5, 2.5), 0.5, 0.00031,
+                                  axial)
+    exp = AxialFlowBatch(sweep.data['r'], sweep.data['pd'], 0.00031, 0.5,
+                         axial)
+    exp.solve()
+    for key in ['mass', 'N_channels', 'dp']:
+        assert np.allclose(sweep.data[key], getattr(exp, key), rtol=1e-12)
+    
+    # 100x the flow: dT_core ~ 0.2 K
+    inputs = {'m_dot' : 75, 'Q_therm' : 131000, 'T' : 1031.45,
+              'P' : 1.766e7, 'dp_limit' : 4.835e9}
+    obs = AxialFlowBatch(0.005, 2, 0.00031, 0.5,
+                         FlowProperties(inputs, 'axial', 200))
+    obs.solve()
+    exp = FlowBatch(0.005, 2, 0.00031, 0.5, FlowProperties(inputs))
+    exp.solve()
+    for key in ['mass', 'N_channels', 'dp']:
+        assert getattr(obs, key) == approx(getattr(exp, key), rel=1e-3)
+
+def test_flow_properties_batch(capsys):
+    """Test batched properties against one FlowProperties per operating
+    point, the aggregated warning and the use in FlowBatch.
+    """
+    T = np.linspace(850, 1250, 9)
+    obs = FlowPropertiesBatch({'T' : T, 'm_dot' : np.array([[0.5], [1.0]])})
+    out = capsys.readouterr().out
+    
+    assert obs.shape == (2, 9)
+    assert obs.n_out_of_range == 4
+    assert out.count('Warning') == 1
+    
+    flowdata = FlowBatch(0.004, 1.6, 0.00031, 0.5, obs)
+    flowdata.solve()
+    for i, m_dot in enumerate([0.5, 1.0]):
+        for j, temp in enumerate(T):
+            props = FlowProperties({'m_dot' : m_dot, 'Q_therm' : 131000,
+                                    'T' : temp, 'P' : 1.766e7,
+                                    'dp_limit' : 483500})
+            for key in ['k_cool', 'mu', 'rho', 'Cp', 'Pr']:
+                assert getattr(obs, key)[i, j] == getattr(props, key)
+            exp = FlowBatch(0.004, 1.6, 0.00031, 0.5, props)
+            exp.solve()
+            assert flowdata.mass[i, j] == exp.mass
+
+def test_default_flow_inputs():
+    """Test that both property classes take their defaults from
+    default_flow_inputs without modifying it.
+    """
+    expected = dict(default_flow_inputs)
+    props = FlowProperties()
+    batch = FlowPropertiesBatch({'m_dot' : [0.5, 1.0]})
+    for name, value in expected.items():
+        assert getattr(props, name) == value
+        assert np.all(getattr(batch, name) == value) or name == 'm_dot'
+    assert default_flow_inputs == expected
@@ -0,0 +1,46 @@
+import numpy as np
+from pytest import approx
+from surrogate import SurrogateTable
+from ht_functions import Flow, oned_flow_modeling
+
+c = 0.00031
+# about 1% max interpolation error; r and L need the finest spacing
+axes = {'r': np.linspace(0.004, 0.008, 17),
+        'pd': np.linspace(1.4, 2.0, 9),
+        'L': np.linspace(0.3, 0.5, 7),
+        'm_dot': np.linspace(0.7, 0.8, 3),
+        'Q_therm': np.linspace(1.2e5, 1.4e5, 3),
+        'T': np.linspace(1000, 1060, 3),
+        'dp_limit': np.array([4e5, 5e5])}
+
+def test_surrogate_nodes(tmp_path):
+    """Test that table lookups reproduce the exact solver at the grid nodes,
+    before and after a save/load round trip.
+    """
+    table = SurrogateTable(axes, c)
+    table.build()
+    path = str(tmp_path / 'table.npz')
+    table.save(path)
+    loaded = SurrogateTable.load(path)
+
+    node = [axes[name][1] for name in SurrogateTable.axis_names]
+    exp = Flow(node[0], node[1], c, node[2], table.props(*node[3:]))
+    oned_flow_modeling(exp)
+    for obs in (table.lookup(*node), loaded.lookup(*node)):
+        for key in SurrogateTable.outputs:
+            assert np.ndim(obs[key]) == 0
+            assert obs[key] == approx(getattr(exp, key), rel=1e-9)
+    # array queries keep their broadcast shape
+    obs = table.lookup(np.full((2, 3), node[0]), *node[1:])
+    assert obs['mass'].shape == (2, 3)
+
+def test_surrogate_error_bounds():
+    """Test that the interpolation error against the exact solver is small
+    for every tabulated result.
+    """
+    table = SurrogateTable(axes, c)
+    table.build()
+    errors = table.error_bounds(n_samples=100)
+
+    for key in SurrogateTable.outputs:
+        assert 0 <= errors[key]['mean'] <= errors[key]['max'] < 0.02
@@ -4,15 +4,17 @@ geometric parameters. It calculates fuel mass and flow characteristics for each
 set of valid geometric parameters.
 
 Functions contained in this module:
-    *oneD_flow_modeling
-    *sweep_configs
+    *main
+    *run
 """
 # Other imports
 import argparse
 import sys
 # Import TH functions
 from physical_constants import FlowProperties
-from ht_functions import Flow, ParametricSweep
+from ht_functions import Flow, ParametricSweep, MassOptimization
+from adaptive_sweep import AdaptiveSweep
+from instrument import Profiler
 from plot import plot
 
 def main():
@@ -28,9 +30,62 @@ def main():
                         help="parameter parameter to plot")
     parser.add_argument("-i", action='store_true', dest='show',
                         default=False, help="--display plot")
+    parser.add_argument("-batch", action='store_true', default=False,
+                        help="evaluate the sweep with vectorized FlowBatch")
+    parser.add_argument("-solver", type=str, default='newton',
+                        choices=['newton', 'fixed-point', 'bounded'],
+                        help="N_channels solver")
+    parser.add_argument("-workers", type=int, default=1,
+                        help="number of parallel sweep processes")
+    parser.add_argument("-warm", action='store_true', default=False,
+                        help="warm start every solve from the previous " +\
+                             "(serpentine-ordered) sweep point")
+    parser.add_argument("-adaptive", type=int, default=0,
+                        help="refinement levels for an adaptive sweep that " +\
+                             "starts from a steps x steps grid")
+    parser.add_argument("-optimize", action='store_true', default=False,
+                        help="find the min mass with a continuous optimizer " +\
+                             "instead of a sweep")
+    parser.add_argument("-store", type=str, default=None,
+                        help="stream sweep results to this .npy file")
+    parser.add_argument("-resume", action='store_true', default=False,
+                        help="resume the checkpointed sweep in -store")
+    parser.add_argument("-profile", action='store_true', default=False,
+                        help="print call counts and timing of the flow model")
+    parser.add_argument("-axial", type=int, default=0,
+                        help="solve the axially discretized model on " +\
+                             "this many nodes instead of the bulk model")
+    parser.add_argument("-pareto", type=lambda arg: arg.split(','),
+                        default=None,
+                        help="comma-separated results to find the Pareto " +\
+                             "set for, e.g. mass,dp,-AR ('-' maximizes)")
+    parser.add_argument("-stride", type=int, default=1,
+                        help="plot every stride-th mesh point")
 
     args = parser.parse_args()
 
+    if args.adaptive:
+        # the adaptive point cloud is not a uniform mesh
+        uniform_only = [name for name, used in
+                        [('-plotkey', args.plotkey), ('-store', args.store),
+                         ('-resume', args.resume),
+                         ('-workers', args.workers > 1),
+                         ('-warm', args.warm), ('-pareto', args.pareto)]
+                        if used]
+        if uniform_only:
+            parser.error(", ".join(uniform_only) + " cannot be combined " +\
+                         "with -adaptive")
+
+    if args.solver == 'bounded':
+        # these options evaluate FlowBatch arrays, which 'bounded' cannot solve
+        batched = [name for name, used in
+                   [('-batch', args.batch), ('-axial', args.axial),
+                    ('-adaptive', args.adaptive), ('-optimize', args.optimize)]
+                   if used]
+        if batched:
+            parser.error(", ".join(batched) + " cannot be combined with " +\
+                         "-solver bounded, use newton or fixed-point")
+
     if args.pd_lower <= 1:
         print("Error: Min fuel pitch must be greater than max coolant channel" +\
               "diameter! Set min PD > 1!")
@@ -43,16 +98,60 @@ def main():
                          'dp_limit' : 483500
                         }
 
-    props = FlowProperties(flow_inputs=primary_flow_data)
-    sweepresults = ParametricSweep(args.steps)
+    if args.axial:
+        props = FlowProperties(primary_flow_data, 'axial', args.axial)
+    else:
+        props = FlowProperties(flow_inputs=primary_flow_data)
+
+    if args.profile:
+        with Profiler() as profiler:
+            run(args, props)
+        print(profiler.report())
+    else:
+        run(args, props)
+
+def run(args, props):
+    """Perform the requested optimization for the parsed arguments.
+    """
+    if args.optimize:
+        optresults = MassOptimization(solver=args.solver)
+        optresults.optimize((args.r_lower, args.r_upper),
+                            (args.pd_lower, args.pd_upper),
+                            args.z, args.clad_t, props)
+        optresults.disp_min_mass()
+        return
+
+    if args.adaptive:
+        sweepresults = AdaptiveSweep(args.steps, args.adaptive)
+        sweepresults.sweep_geometric_configs((args.r_lower, args.r_upper),
+                                             (args.pd_lower, args.pd_upper),
+                                             args.z, args.clad_t, props,
+                                             method=args.solver)
+        sweepresults.get_min_mass()
+        sweepresults.disp_min_mass()
+        return
+
+    sweepresults = ParametricSweep(args.steps, args.store, args.resume)
     sweepresults.sweep_geometric_configs((args.r_lower, args.r_upper),
                                          (args.pd_lower, args.pd_upper),
-                                          args.z, args.clad_t, props)
+                                          args.z, args.clad_t, props,
+                                          batch=args.batch, method=args.solver,
+                                          workers=args.workers,
+                                          warm_start=args.warm)
     sweepresults.get_min_mass()
     sweepresults.disp_min_mass()
+    print("N_channels solver evaluations: " + str(sweepresults.solver_evals))
+
+    pareto_idx = None
+    if args.pareto:
+        pareto_idx, front = sweepresults.get_pareto_front(args.pareto)
+        print("Pareto set (" + ", ".join(args.pareto) + "): " +\
+              str(len(pareto_idx)) + " of " + str(len(sweepresults.data)) +\
+              " designs.")
 
     if args.plotkey:
-        plt = plot(sweepresults, args.plotkey, Flow.savedata)
+        plt = plot(sweepresults, args.plotkey, Flow.savedata, args.stride,
+                   pareto_idx)
         savename = args.plotkey + '.png'
         plt.savefig(savename, dpi=500)
         if args.show: